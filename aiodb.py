@@ -0,0 +1,81 @@
+# aiodb.py
+# asyncio-вариант API db.py для async-обработчиков flet.
+# Чтения выполняются в ограниченном пуле потоков (у каждого потока своё соединение),
+# записи уходят в очередь потока-писателя, и их Future превращается в awaitable.
+#
+# Пример: habits, entries = await asyncio.gather(
+#     aiodb.get_all_habits(), aiodb.get_entries_for_month(2025, 10, status="done"))
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import db
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="db-reader")
+
+async def _read(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+async def _write(fn, *args, **kwargs):
+    return await asyncio.wrap_future(fn(*args, wait=False, **kwargs))
+
+# --- чтение ---
+
+async def get_all_habits():
+    return await _read(db.get_all_habits)
+
+async def get_habit(hid):
+    return await _read(db.get_habit, hid)
+
+async def get_entries_in_range(start_date, end_date, habit_id=None, status=None):
+    return await _read(db.get_entries_in_range, start_date, end_date, habit_id, status)
+
+async def get_entries_between(start_date, end_date, habit_id=None, status=None):
+    return await _read(db.get_entries_between, start_date, end_date, habit_id, status)
+
+async def get_entries_for_month(year, month, habit_id=None, status=None):
+    return await _read(db.get_entries_for_month, year, month, habit_id, status)
+
+async def get_entries_for_year(year, habit_id=None, status=None):
+    return await _read(db.get_entries_for_year, year, habit_id, status)
+
+async def get_completion_grid(start_date, days=7, habit_ids=None, status="done"):
+    return await _read(db.get_completion_grid, start_date, days, habit_ids, status)
+
+async def get_entries_for_habit_on_date(habit_id, date):
+    return await _read(db.get_entries_for_habit_on_date, habit_id, date)
+
+async def count_entries_by_month(year, status="done"):
+    return await _read(db.count_entries_by_month, year, status)
+
+async def count_entries_by_weekday(year, status="done"):
+    return await _read(db.count_entries_by_weekday, year, status)
+
+async def count_entries_by_habit(year, status="done"):
+    return await _read(db.count_entries_by_habit, year, status)
+
+async def get_done_bitmaps(year):
+    return await _read(db.get_done_bitmaps, year)
+
+# --- запись ---
+
+async def add_habit(habit):
+    return await _write(db.add_habit, habit)
+
+async def update_habit(habit_id, fields):
+    return await _write(db.update_habit, habit_id, fields)
+
+async def delete_habit(habit_id):
+    return await _write(db.delete_habit, habit_id)
+
+async def set_entry(habit_id, date, status):
+    return await _write(db.set_entry, habit_id, date, status)
+
+async def set_entries(entries):
+    return await _write(db.set_entries, entries)
+
+async def update_last_notified(habit_id, timestamp):
+    return await _write(db.update_last_notified, habit_id, timestamp)
+
+async def write(fn, *args, on_commit=None):
+    return await _write(db.write, fn, *args, on_commit=on_commit)
@@ -0,0 +1,49 @@
+# archive.py
+# Архивация старых записей: строки entries старше границы переносятся в
+# entries_archive, счётчики по месяцам и дням недели остаются в основной базе
+# (archived_month_summary / archived_weekday_summary). Горячая таблица entries
+# остаётся маленькой, а статистика за архивные годы читается из сводок.
+from datetime import date
+
+HORIZON_KEY = "archived_before"
+
+def horizon(con):
+    """Граница архива (date): всё раньше неё может лежать в entries_archive. None — архива нет."""
+    row = con.execute("SELECT value FROM meta WHERE key=?", (HORIZON_KEY,)).fetchone()
+    return date.fromisoformat(row[0]) if row else None
+
+def archive_before(con, before: date) -> int:
+    """
+    Перенести в архив записи с датой раньше before. Возвращает число
+    перенесённых строк. Сводки архива пополняются триггером на entries_archive,
+    сводные таблицы entries уменьшаются триггерами удаления.
+    """
+    day = before.toordinal()
+    # Битовые карты описывают всю историю и при переносе не меняются
+    con.execute(
+        # id сохраняется: запись остаётся той же строкой и в выгрузках, и в ALL_ENTRIES
+        "INSERT INTO entries_archive (id, habit_id, date, status) "
+        "SELECT id, habit_id, date, status FROM entries WHERE day < ? ORDER BY id",
+        (day,)
+    )
+    moved = con.execute("DELETE FROM entries WHERE day < ?", (day,)).rowcount
+    current = horizon(con)
+    if current is None or before > current:
+        con.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            (HORIZON_KEY, before.isoformat())
+        )
+    return moved
+
+def clear(con):
+    """Удалить архив целиком вместе со сводками (замена данных при импорте)."""
+    con.execute("DELETE FROM entries_archive")
+    con.execute("DELETE FROM archived_month_summary")
+    con.execute("DELETE FROM archived_weekday_summary")
+    con.execute("DELETE FROM meta WHERE key=?", (HORIZON_KEY,))
+
+def stats(con) -> dict:
+    hot = con.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    archived = con.execute("SELECT COUNT(*) FROM entries_archive").fetchone()[0]
+    border = horizon(con)
+    return {"hot": hot, "archived": archived, "horizon": border.isoformat() if border else None}
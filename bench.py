@@ -0,0 +1,209 @@
+# bench.py
+# Бенчмарки: синтетические данные во временной базе и замеры вкладок и функций db.py.
+#
+#   python bench.py --habits 10 100 --years 1 5 --repeat 5 --output bench.json
+#
+# Результат — JSON (версии, параметры, для каждого набора данных — время
+# каждого замера в мс), чтобы сравнивать его между релизами.
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import db
+import events
+import instrument
+import transfer
+from models import date_to_str, week_start
+
+HABIT_STATUSES = ["в процессе", "выполнено", "заброшено"]
+COLORS = ["red", "green", "blue", "orange", "purple", "teal"]
+
+def generate_records(habits: int, years: int, seed: int = 0, end: date = None, chunk_size: int = 50000):
+    """
+    Записи для transfer: привычки, затем порции (habit_id, date, status).
+    У каждой привычки своя базовая вероятность выполнения, выходные даются
+    хуже, а выполнение вчера повышает шанс сегодня (серии). Часть привычек
+    начинается позже начала периода или уже завершена.
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    first = end - timedelta(days=365 * years)
+    profiles = []
+    for hid in range(1, habits + 1):
+        start = first + timedelta(days=rng.randrange(0, max(1, 365 * years // 2)))
+        finish = None
+        if rng.random() < 0.2:
+            finish = start + timedelta(days=rng.randrange(30, 365 * years + 1))
+            if finish >= end:
+                finish = None
+        status = "в процессе" if finish is None else rng.choice(HABIT_STATUSES[1:])
+        yield "habit", {
+            "id": hid, "name": f"Привычка {hid}", "color": rng.choice(COLORS),
+            "start_date": date_to_str(start), "end_date": date_to_str(finish) if finish else None,
+            "status": status, "notification_interval": "Без уведомлений",
+        }
+        profiles.append((hid, start, finish or end, rng.uniform(0.3, 0.95)))
+
+    rows = []
+    for hid, start, finish, base in profiles:
+        done_yesterday = False
+        d = start
+        while d <= finish:
+            p = base * (0.7 if d.weekday() >= 5 else 1.0)
+            p = min(0.99, p + 0.15) if done_yesterday else p * 0.8
+            r = rng.random()
+            if r < p:
+                rows.append((hid, date_to_str(d), "done"))
+                done_yesterday = True
+            else:
+                # пропуск отмечают не всегда
+                if r < p + (1 - p) * 0.5:
+                    rows.append((hid, date_to_str(d), "skipped"))
+                done_yesterday = False
+            if len(rows) >= chunk_size:
+                yield "entry_rows", rows
+                rows = []
+            d += timedelta(days=1)
+    if rows:
+        yield "entry_rows", rows
+
+def generate(path: str, habits: int, years: int, seed: int = 0) -> dict:
+    """Создать базу path с синтетическими данными и переключить db на неё."""
+    db.use_database(path)
+    return transfer.load_records(generate_records(habits, years, seed), chunk_size=50000)
+
+def _time(fn, repeat: int) -> dict:
+    fn()  # прогрев: кэши, страницы базы
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - started) * 1000)
+    return {
+        "min_ms": round(min(runs), 3),
+        "median_ms": round(statistics.median(runs), 3),
+        "mean_ms": round(statistics.fmean(runs), 3),
+        "runs": repeat,
+    }
+
+def _page_stub():
+    # Вкладкам нужны только атрибуты состояния и update(); отрисовка не замеряется
+    return SimpleNamespace(update=lambda: None, overlay=[])
+
+def run_suite(workdir: str, repeat: int = 5, with_pdf: bool = True) -> dict:
+    """Замеры на текущей базе db. Импорт/экспорт пишут файлы в workdir."""
+    # вкладки импортируются здесь: flet/matplotlib/reportlab нужны только для замеров UI
+    from tabs import week_tab, month_tab, charts_tab
+
+    t = date.today()
+    year = t.year
+    results = {}
+    week = week_start(t)
+    results["week_tab.get_week_habits"] = _time(lambda: week_tab.get_week_habits(week), repeat)
+    results["week_tab.get_week_habits[год назад]"] = _time(lambda: week_tab.get_week_habits(week - timedelta(weeks=52)), repeat)
+    results["week_tab.get_week_habits[страница]"] = _time(lambda: week_tab.get_week_habits(week, 0, week_tab.ROWS_PER_PAGE), repeat)
+
+    # Запросы месяца без кэша периодов и построение вкладки, когда данные месяца
+    # и соседей уже в кэше (как при навигации после первого показа)
+    results["month_tab.load_month"] = _time(lambda: month_tab.load_month(t.year, t.month), repeat)
+    page = _page_stub()
+    page.month_year = (t.year, t.month)
+
+    def build_month():
+        month_tab.build_month_tab(page, lambda: None)
+        events.unsubscribe("tab")
+    build_month()
+    db.wait_prefetch()
+    results["month_tab.build[кэш]"] = _time(build_month, repeat)
+
+    results["charts_tab.get_monthly_percentage_data"] = _time(lambda: charts_tab.get_monthly_percentage_data(year), repeat)
+    results["charts_tab.get_weekday_activity_data"] = _time(lambda: charts_tab.get_weekday_activity_data(year), repeat)
+    results["charts_tab.get_habit_performance_data"] = _time(lambda: charts_tab.get_habit_performance_data(year), repeat)
+    results["charts_tab.get_status_distribution_data"] = _time(charts_tab.get_status_distribution_data, repeat)
+    for chart_type in ("monthly_percentage", "weekday_activity", "habit_performance", "status_distribution"):
+        results[f"charts_tab.create_chart[{chart_type}]"] = _time(lambda: charts_tab.create_chart(chart_type, year), repeat)
+    if with_pdf:
+        results["charts_tab.build_pdf_report"] = _time(lambda: charts_tab.build_pdf_report(year), max(1, repeat // 2))
+
+    results["db.get_all_habits"] = _time(db.get_all_habits, repeat)
+    results["db.get_entries_for_month"] = _time(lambda: db.get_entries_for_month(t.year, t.month), repeat)
+    results["db.get_entries_for_year"] = _time(lambda: db.get_entries_for_year(year, status="done"), repeat)
+    results["db.count_entries_by_month"] = _time(lambda: db.count_entries_by_month(year), repeat)
+    results["db.count_entries_by_weekday"] = _time(lambda: db.count_entries_by_weekday(year), repeat)
+    results["db.count_entries_by_habit"] = _time(lambda: db.count_entries_by_habit(year), repeat)
+    results["db.get_done_bitmaps"] = _time(lambda: db.get_done_bitmaps(year), repeat)
+
+    export_path = os.path.join(workdir, "export.json")
+    results["transfer.export_data[json]"] = _time(lambda: transfer.export_data(export_path), max(1, repeat // 2))
+    results["transfer.import_data[json]"] = _time(lambda: transfer.import_data(export_path), max(1, repeat // 2))
+    return results
+
+def run(habit_counts, year_counts, repeat: int = 5, seed: int = 0, with_pdf: bool = True, progress=print) -> dict:
+    """Полный прогон по всем сочетаниям размеров; исходная база db восстанавливается."""
+    original = db.DB_PATH
+    workdir = tempfile.mkdtemp(prefix="habits-bench-")
+    report = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "seed": seed,
+        "datasets": [],
+    }
+    try:
+        for habits in habit_counts:
+            for years in year_counts:
+                path = os.path.join(workdir, f"bench-{habits}x{years}.db")
+                started = time.perf_counter()
+                counts = generate(path, habits, years, seed)
+                generated_ms = (time.perf_counter() - started) * 1000
+                if progress:
+                    progress(f"{habits} привычек × {years} лет: {counts['entries']} записей")
+                instrument.reset()
+                results = run_suite(workdir, repeat, with_pdf)
+                report["datasets"].append({
+                    "habits": habits,
+                    "years": years,
+                    "entries": counts["entries"],
+                    "generate_ms": round(generated_ms, 3),
+                    "db_size_bytes": os.path.getsize(path),
+                    "results": results,
+                    "db_calls": instrument.stats(),
+                })
+    finally:
+        db.use_database(original)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки трекера привычек на синтетических данных")
+    parser.add_argument("--habits", type=int, nargs="+", default=[10, 100], help="числа привычек (например 10 100 1000)")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5], help="длины истории в годах (например 1 5 10)")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждого замера")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-pdf", action="store_true", help="не замерять PDF-отчёт")
+    parser.add_argument("--output", help="файл для JSON (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    log = (lambda msg: print(msg, flush=True)) if args.output else None
+    report = run(args.habits, args.years, args.repeat, args.seed, not args.no_pdf, progress=log)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
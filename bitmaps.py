@@ -0,0 +1,108 @@
+# bitmaps.py
+# Компактное хранилище отметок "выполнено": один BLOB на (habit_id, year),
+# бит i — день года i (0 = 1 января). 366 бит = 46 байт на привычку в год.
+#
+# Карты обновляет db.py в потоке-писателе при записи отметок (update), а не
+# триггеры: база остаётся открываемой любым клиентом SQLite без наших функций.
+# Записи в entries в обход db.py карты не меняют — после них нужен enable().
+# Вкладки карты не читают (им хватает сводок); get_done_bitmaps отдаёт год
+# истории всех привычек одним запросом для массовой обработки (bench.py, aiodb).
+import calendar
+from datetime import date
+import numpy as np
+from migrations import ALL_ENTRIES
+from models import date_to_str, str_to_date
+
+BITMAP_BYTES = 46
+
+def is_enabled(con) -> bool:
+    row = con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='entry_bitmaps'").fetchone()
+    return row is not None
+
+def build(con, year: int = None) -> dict:
+    """Собрать битовые карты из entries и архива: {(habit_id, year): bytes}."""
+    sql = f"SELECT habit_id, CAST(substr(date, 1, 4) AS INTEGER), CAST(strftime('%j', date) AS INTEGER) - 1 FROM {ALL_ENTRIES} WHERE status='done' AND day IS NOT NULL"
+    params = ()
+    if year is not None:
+        sql += " AND day >= ? AND day < ?"
+        params = (date(year, 1, 1).toordinal(), date(year + 1, 1, 1).toordinal())
+    maps = {}
+    for habit_id, y, index in con.execute(sql, params):
+        buf = maps.get((habit_id, y))
+        if buf is None:
+            buf = maps[(habit_id, y)] = bytearray(BITMAP_BYTES)
+        buf[index >> 3] |= 1 << (index & 7)
+    return {key: bytes(buf) for key, buf in maps.items()}
+
+def update(con, rows):
+    """
+    Перенести в карты записанные отметки rows: (habit_id, date, status).
+    "done" ставит бит, любой другой статус снимает. Нераспознаваемые даты
+    (в entries у них day = NULL) пропускаются.
+    """
+    changes = {}
+    for habit_id, ds, status in rows:
+        try:
+            d = str_to_date(ds)
+        except (TypeError, ValueError):
+            continue
+        if date_to_str(d) != ds:
+            continue
+        changes.setdefault((habit_id, d.year), []).append((day_index(d), status == "done"))
+    for (habit_id, year), days in changes.items():
+        row = con.execute("SELECT bits FROM entry_bitmaps WHERE habit_id=? AND year=?", (habit_id, year)).fetchone()
+        buf = bytearray(row[0] if row else BITMAP_BYTES)
+        for index, on in days:
+            if on:
+                buf[index >> 3] |= 1 << (index & 7)
+            else:
+                buf[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+        con.execute(
+            "INSERT INTO entry_bitmaps (habit_id, year, bits) VALUES (?, ?, ?) "
+            "ON CONFLICT (habit_id, year) DO UPDATE SET bits = excluded.bits",
+            (habit_id, year, bytes(buf))
+        )
+
+def delete_habit(con, habit_id: int):
+    con.execute("DELETE FROM entry_bitmaps WHERE habit_id=?", (habit_id,))
+
+def enable(con):
+    """Создать таблицу карт и заполнить её из entries и архива (повторный вызов — пересборка)."""
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS entry_bitmaps (
+        habit_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        bits BLOB NOT NULL,
+        PRIMARY KEY (habit_id, year)
+    ) WITHOUT ROWID
+    """)
+    con.execute("DELETE FROM entry_bitmaps")
+    con.executemany(
+        "INSERT INTO entry_bitmaps (habit_id, year, bits) VALUES (?, ?, ?)",
+        [(habit_id, year, bits) for (habit_id, year), bits in build(con).items()]
+    )
+
+def disable(con):
+    con.execute("DROP TABLE IF EXISTS entry_bitmaps")
+
+def unpack(bits: bytes, year: int) -> np.ndarray:
+    """Битовая карта -> булев массив длиной в число дней года."""
+    days = 366 if calendar.isleap(year) else 365
+    return np.unpackbits(np.frombuffer(bits, dtype=np.uint8), bitorder="little")[:days].astype(bool)
+
+def done_matrix(maps: dict, year: int, habit_ids=None):
+    """
+    Матрица habits × дни года из {habit_id: bytes}.
+    Возвращает (список habit_id, булев массив формы (len(habit_ids), дней в году)).
+    """
+    if habit_ids is None:
+        habit_ids = sorted(maps)
+    days = 366 if calendar.isleap(year) else 365
+    empty = bytes(BITMAP_BYTES)
+    packed = np.frombuffer(b"".join(maps.get(h, empty) for h in habit_ids), dtype=np.uint8)
+    matrix = np.unpackbits(packed.reshape(len(habit_ids), BITMAP_BYTES), axis=1, bitorder="little")
+    return list(habit_ids), matrix[:, :days].astype(bool)
+
+def day_index(d: date) -> int:
+    """Номер столбца матрицы для даты (0 = 1 января)."""
+    return d.timetuple().tm_yday - 1
@@ -0,0 +1,159 @@
+# cache.py
+# Кэши в памяти процесса: метаданные привычек и данные периодов для навигации
+import queue
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+
+
+class HabitCache:
+    """
+    Read-through кэш списка привычек. Любая запись в habits увеличивает версию
+    (invalidate), и следующий читатель загружает свежий снимок из базы.
+    Снимок неизменяемый: кортеж из MappingProxyType, его можно раздавать
+    любым потокам без копирования.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self.version = 0
+        self._snapshot = ()
+        self._by_id = {}
+        self._snapshot_version = -1
+        self.hits = 0
+        self.misses = 0
+
+    def _current(self):
+        with self._lock:
+            if self._snapshot_version == self.version:
+                self.hits += 1
+                return self._snapshot, self._by_id
+            self.misses += 1
+            version = self.version
+        snapshot = tuple(MappingProxyType(h) for h in self._loader())
+        by_id = {h["id"]: h for h in snapshot}
+        with self._lock:
+            # Если за время загрузки была запись — снимок уже устарел, не сохраняем
+            if version == self.version:
+                self._snapshot, self._by_id, self._snapshot_version = snapshot, by_id, version
+        return snapshot, by_id
+
+    def all(self):
+        return self._current()[0]
+
+    def get(self, habit_id):
+        return self._current()[1].get(habit_id)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "version": self.version}
+
+
+class PeriodCache:
+    """
+    Кэш данных периодов (недель, месяцев) для навигации по вкладкам.
+    Ключ — (вид, начало, конец, доп. параметры), начало и конец — date,
+    конец не входит. Запись отметки сбрасывает только периоды, содержащие её
+    дату; запись привычек — всё. Загрузка, начатая до сброса, результат не
+    сохраняет (та же схема с версией, что у HabitCache).
+
+    prefetch() загружает соседние периоды в фоновом потоке, чтобы переход
+    к ним не ждал запросов.
+    """
+
+    def __init__(self, max_items: int = 32):
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self.version = 0
+        self._queue = None
+        self._queued = set()
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+
+    def get(self, key, loader):
+        """Данные периода key; при промахе — loader() и сохранение."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            version = self.version
+        value = loader()
+        self._store(key, value, version)
+        return value
+
+    def _store(self, key, value, version):
+        with self._lock:
+            if version != self.version:
+                return False
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+            return True
+
+    def prefetch(self, key, loader):
+        """Поставить загрузку key в фоновую очередь, если его ещё нет в кэше."""
+        with self._lock:
+            if key in self._items or key in self._queued:
+                return
+            self._queued.add(key)
+            if self._queue is None:
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,), name="period-prefetch", daemon=True).start()
+            self._queue.put((key, loader, self.version))
+
+    def _run(self, jobs):
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            key, loader, version = job
+            try:
+                if self._store(key, loader(), version):
+                    with self._lock:
+                        self.prefetched += 1
+            except Exception as ex:
+                print("Ошибка предзагрузки периода:", ex)
+            finally:
+                with self._lock:
+                    self._queued.discard(key)
+                jobs.task_done()
+
+    def join(self):
+        """Дождаться загрузки всего, что уже поставлено в prefetch()."""
+        with self._lock:
+            jobs = self._queue
+        if jobs is not None:
+            jobs.join()
+
+    def invalidate(self, dates=None):
+        """Сбросить периоды, содержащие даты dates (date), или все при dates=None."""
+        with self._lock:
+            self.version += 1
+            if dates is None:
+                self._items.clear()
+                return
+            for key in [k for k in self._items if any(k[1] <= d < k[2] for d in dates)]:
+                del self._items[key]
+
+    def close(self):
+        with self._lock:
+            self._items.clear()
+            self.version += 1
+            if self._queue is not None:
+                self._queue.put(None)
+                self._queue = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "prefetched": self.prefetched,
+                    "size": len(self._items), "version": self.version}
@@ -0,0 +1,114 @@
+# connection.py
+# Менеджер соединений SQLite: постоянное соединение на каждый поток
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+
+class ConnectionManager:
+    """
+    Выдаёт каждому потоку (UI, поток уведомлений и т.д.) собственное
+    постоянное соединение с базой. Схема проверяется один раз — при первом
+    обращении, а не при каждом запросе.
+    """
+
+    def __init__(self, path: str, init_schema=None, on_connect=None, cached_statements: int = 256, wal: bool = True):
+        self.path = path
+        # WAL: читатели не блокируются писателем и наоборот
+        self.wal = wal
+        self._init_schema = init_schema
+        # вызывается для каждого нового соединения (регистрация SQL-функций и т.п.)
+        self._on_connect = on_connect
+        self._cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ready = False
+        # (weakref на поток, соединение) — чтобы закрывать соединения завершившихся потоков
+        self._connections = []
+
+    def _open(self) -> sqlite3.Connection:
+        # isolation_level=None: транзакциями управляем явно через transaction()
+        con = sqlite3.connect(
+            self.path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self._cached_statements,
+        )
+        # ждать освобождения блокировки вместо мгновенного "database is locked"
+        con.execute("PRAGMA busy_timeout = 5000")
+        if self.wal:
+            con.execute("PRAGMA synchronous = NORMAL")
+        if self._on_connect:
+            self._on_connect(con)
+        return con
+
+    def ensure_schema(self):
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if self._init_schema:
+                con = self._open()
+                try:
+                    if self.wal:
+                        con.execute("PRAGMA journal_mode = WAL")
+                    self._init_schema(con)
+                finally:
+                    con.close()
+            self._ready = True
+
+    def connection(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            return con
+        self.ensure_schema()
+        con = self._open()
+        with self._lock:
+            alive = []
+            for thread_ref, other in self._connections:
+                if thread_ref() is None or not thread_ref().is_alive():
+                    other.close()
+                else:
+                    alive.append((thread_ref, other))
+            alive.append((weakref.ref(threading.current_thread()), con))
+            self._connections = alive
+        self._local.con = con
+        return con
+
+    def close_all(self):
+        """Закрыть все соединения; следующий вызов connection() заново проверит схему."""
+        with self._lock:
+            for _, con in self._connections:
+                con.close()
+            self._connections = []
+            self._local = threading.local()
+            self._ready = False
+
+
+@contextmanager
+def transaction(con: sqlite3.Connection):
+    """
+    Транзакция на соединении в режиме autocommit. Вложенный вызов
+    превращается в SAVEPOINT, так что функции записи можно комбинировать.
+    """
+    if con.in_transaction:
+        con.execute("SAVEPOINT nested")
+        try:
+            yield con
+        except BaseException:
+            con.execute("ROLLBACK TO nested")
+            con.execute("RELEASE nested")
+            raise
+        con.execute("RELEASE nested")
+    else:
+        con.execute("BEGIN")
+        try:
+            yield con
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        con.execute("COMMIT")
@@ -1,135 +1,476 @@
 # db.py
-import sqlite3
 import os
-from typing import List, Dict, Any
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Tuple, Mapping
+import migrations
+import bitmaps
+import archive
+import profiles
+import events
+import instrument
+from instrument import timed
+from datetime import date, timedelta
+from models import date_to_str, str_to_date, date_to_day, month_bounds, year_bounds
 
+# База профиля по умолчанию; остальные профили — data/profiles/<имя>.db
 DB_PATH = os.path.join(os.path.dirname(__file__), "data", "habits.db")
+PROFILES_DIR = os.path.join(os.path.dirname(__file__), "data", "profiles")
 
-def ensure_db():
-    os.makedirs(os.path.join(os.path.dirname(__file__), "data"), exist_ok=True)
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    # habits: id, name, color, start_date, end_date, description
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS habits (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        color TEXT NOT NULL,
-        start_date TEXT,  -- YYYY-MM-DD or NULL
-        end_date TEXT,
-        status TEXT CHECK(status IN ('в процессе', 'выполнено', 'заброшено')) NOT NULL DEFAULT 'в процессе',
-        notification_interval TEXT,
-        last_notified REAL DEFAULT 0
-    )
-    """)
-    # entries: id, habit_id, date (YYYY-MM-DD), status (in_progress, done, skipped, overdue)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS entries (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        habit_id INTEGER NOT NULL,
-        date TEXT NOT NULL,
-        status TEXT NOT NULL,
-        FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE
+def _on_connect(con):
+    instrument.attach(con)
+
+def _load_habits(con) -> List[Dict]:
+    rows = con.execute("SELECT id, name, color, start_date, end_date, status, notification_interval, last_notified FROM habits").fetchall()
+    return [{"id": r[0], "name": r[1], "color": r[2], "start_date": r[3], "end_date": r[4], "status": r[5], "notification_interval": r[6], "last_notified": r[7]} for r in rows]
+
+def _open_profile(name: str, path: str, bind) -> profiles.Profile:
+    # У каждого профиля: одно соединение на поток (схема проверяется один раз),
+    # свой поток-писатель и свой кэш привычек
+    return profiles.Profile(
+        name, path, init_schema=migrations.migrate, on_connect=_on_connect,
+        load_habits=_load_habits, bind=bind,
     )
-    """)
-    con.commit()
-    con.close()
+
+_router = profiles.ProfileRouter(DB_PATH, PROFILES_DIR, _open_profile)
+
+def _profile() -> profiles.Profile:
+    return _router.get()
+
+def ensure_db():
+    _profile().manager.ensure_schema()
+
+def close():
+    """Дописать очередь записи и закрыть все соединения текущего профиля (восстановление, смена базы)."""
+    _router.close()
+
+def close_all():
+    """Закрыть все открытые профили (выход из приложения)."""
+    _router.close_all()
+
+def use_database(path: str):
+    """Переключиться на другой файл базы (служебные команды, бенчмарки)."""
+    global DB_PATH
+    DB_PATH = path
+    _router.set_default_path(path)
+    _router.activate(profiles.DEFAULT_PROFILE)
+    events.publish(events.DATA_RELOADED, profile=profiles.DEFAULT_PROFILE)
+
+def db_path() -> str:
+    """Файл базы текущего профиля."""
+    return _profile().path
+
+def use_profile(name: str):
+    """Сделать профиль name текущим для всего приложения; база создаётся при первом обращении."""
+    _router.activate(name)
+    events.publish(events.DATA_RELOADED, profile=name)
+
+def active_profile() -> str:
+    return _profile().name
+
+def list_profiles() -> List[str]:
+    return _router.list_profiles()
+
+def close_profile(name: str):
+    """Закрыть соединения и поток-писатель профиля; он откроется снова при следующем обращении."""
+    _router.close(name)
+
+@contextmanager
+def profile(name: str):
+    """Выполнить блок с профилем name в текущем потоке, не меняя активный профиль приложения."""
+    previous = _router.pin(name)
+    try:
+        yield
+    finally:
+        _router.unpin(previous)
 
 def get_conn():
-    ensure_db()
-    return sqlite3.connect(DB_PATH)
+    """
+    Соединение текущего потока с базой текущего профиля. Закрывать его не нужно — оно переиспользуется.
+    """
+    return _profile().connection()
 
-def add_habit(habit: Dict[str, Any]) -> int:
-    con = get_conn()
-    cur = con.cursor()
-    cur.execute(
+# Все записи профиля выполняет его поток-писатель (group commit), чтения идут
+# параллельно со своих соединений — в режиме WAL они не блокируют друг друга
+def write(fn, *args, wait: bool = True, on_commit=None):
+    """
+    Выполнить fn(con, *args) в потоке-писателе текущего профиля. При wait=True
+    дождаться коммита и вернуть результат, иначе вернуть Future.
+    """
+    future = _profile().writer.submit(fn, *args, on_commit=on_commit)
+    return future.result() if wait else future
+
+def flush_writes():
+    """Дождаться записи всего, что уже поставлено в очередь."""
+    write(lambda con: None)
+
+def query_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Статистика вызовов функций db.py: число вызовов, задержки (гистограмма),
+    число возвращённых строк. Для записей с wait=False учитывается только
+    постановка в очередь.
+    """
+    return instrument.stats()
+
+def slow_queries() -> List[Dict[str, Any]]:
+    """Медленные вызовы (дольше instrument.SLOW_MS) с SQL и планами запросов."""
+    return instrument.slow_queries()
+
+# Привычки меняются редко, а читаются при каждом обновлении вкладок и каждые 5 секунд
+# потоком уведомлений — у каждого профиля неизменяемый снимок в памяти (profiles.Profile.habits)
+def invalidate_habits():
+    """Сбросить кэши привычек и периодов; вызывать после любой записи в habits в обход db.py."""
+    _profile().habits.invalidate()
+    _profile().periods.invalidate()
+
+def habit_cache_stats() -> Dict[str, int]:
+    return _profile().habits.stats()
+
+# Данные недель и месяцев, уже показанных во вкладках или загруженных заранее
+# (profiles.Profile.periods). Сбрасываются хуками записи ниже — до того, как
+# Future записи завершится, поэтому чтение после write() кэш не обманет
+def cached_period(kind: str, start: date, end: date, loader, *extra):
+    """Данные периода [start, end) вида kind: из кэша или loader()."""
+    return _profile().periods.get((kind, start, end, *extra), loader)
+
+def prefetch_period(kind: str, start: date, end: date, loader, *extra):
+    """Загрузить период заранее в фоновом потоке (в профиле, текущем на момент вызова)."""
+    name = _profile().name
+
+    def load():
+        with profile(name):
+            return loader()
+    _profile().periods.prefetch((kind, start, end, *extra), load)
+
+def wait_prefetch():
+    """Дождаться фоновой загрузки периодов текущего профиля (замеры, проверки)."""
+    _profile().periods.join()
+
+def period_cache_stats() -> Dict[str, int]:
+    return _profile().periods.stats()
+
+# Хуки on_commit: события публикуются только после успешного коммита.
+# Выполняются в потоке-писателе, поэтому _profile() — профиль этой записи.
+def _notify(kind: str, **data):
+    def hook():
+        events.publish(kind, profile=_profile().name, **data)
+    return hook
+
+def _habits_changed(kind: str, **data):
+    notify = _notify(kind, **data)
+    def hook():
+        invalidate_habits()
+        notify()
+    return hook
+
+def _entries_changed(kind: str, dates: Iterable[str], **data):
+    notify = _notify(kind, **data)
+    def hook():
+        try:
+            changed = {str_to_date(d) for d in dates}
+        except (TypeError, ValueError):
+            # дата, которую не разбирает datetime ("2024-02-30"): сбрасываем все периоды
+            changed = None
+        _profile().periods.invalidate(changed)
+        notify()
+    return hook
+
+def _last_notified_changed():
+    # last_notified во вкладках не показывается — кэш периодов не трогаем
+    _profile().habits.invalidate()
+
+def data_reloaded():
+    """Хук после массовой замены данных (импорт, архивация): сбросить кэш и оповестить подписчиков."""
+    invalidate_habits()
+    events.publish(events.DATA_RELOADED, profile=_profile().name)
+
+def _add_habit(con, habit: Dict[str, Any]) -> int:
+    cur = con.execute(
         "INSERT INTO habits (name, color, start_date, end_date, status, notification_interval) VALUES (?, ?, ?, ?, ?, ?)",
         (habit["name"], habit["color"], habit.get("start_date"), habit.get("end_date"), habit.get("status"), habit.get("notification_interval", "Без уведомлений"))
     )
-    hid = cur.lastrowid
-    con.commit()
-    con.close()
-    return hid
+    return cur.lastrowid
 
-def update_habit(habit_id: int, fields: Dict[str, Any]):
-    con = get_conn()
-    cur = con.cursor()
+@timed(rows=False)
+def add_habit(habit: Dict[str, Any], wait: bool = True) -> int:
+    created = {}
+
+    def op(con, habit):
+        created["id"] = _add_habit(con, habit)
+        return created["id"]
+
+    def hook():
+        _habits_changed(events.HABIT_ADDED, habit_id=created.get("id"))()
+    return write(op, habit, wait=wait, on_commit=hook)
+
+def _update_habit(con, habit_id: int, fields: Dict[str, Any]):
     sets = ", ".join([f"{k}=?" for k in fields.keys()])
     params = list(fields.values()) + [habit_id]
-    cur.execute(f"UPDATE habits SET {sets} WHERE id=?", params)
-    con.commit()
-    con.close()
+    con.execute(f"UPDATE habits SET {sets} WHERE id=?", params)
 
-def delete_habit(habit_id: int):
-    con = get_conn()
-    cur = con.cursor()
-    cur.execute("DELETE FROM habits WHERE id=?", (habit_id,))
-    cur.execute("DELETE FROM entries WHERE habit_id=?", (habit_id,))
-    con.commit()
-    con.close()
+@timed(rows=False)
+def update_habit(habit_id: int, fields: Dict[str, Any], wait: bool = True):
+    return write(_update_habit, habit_id, fields, wait=wait,
+                 on_commit=_habits_changed(events.HABIT_UPDATED, habit_id=habit_id, fields=dict(fields)))
+
+def _delete_habit(con, habit_id: int):
+    con.execute("DELETE FROM habits WHERE id=?", (habit_id,))
+    con.execute("DELETE FROM entries WHERE habit_id=?", (habit_id,))
+    con.execute("DELETE FROM entries_archive WHERE habit_id=?", (habit_id,))
+    if bitmaps.is_enabled(con):
+        bitmaps.delete_habit(con, habit_id)
+
+@timed(rows=False)
+def delete_habit(habit_id: int, wait: bool = True):
+    return write(_delete_habit, habit_id, wait=wait, on_commit=_habits_changed(events.HABIT_DELETED, habit_id=habit_id))
+
+@timed
+def get_all_habits() -> Tuple[Mapping[str, Any], ...]:
+    """Неизменяемый снимок всех привычек (из кэша, если не было записей)."""
+    return _profile().habits.all()
+
+@timed
+def get_habit(hid: int) -> Mapping[str, Any]:
+    return _profile().habits.get(hid)
+
+def _set_entry(con, habit_id: int, date: str, status: str):
+    # Один UPSERT по уникальному индексу (habit_id, date) вместо SELECT + UPDATE/INSERT
+    con.execute(
+        "INSERT INTO entries (habit_id, date, status) VALUES (?, ?, ?) "
+        "ON CONFLICT(habit_id, date) DO UPDATE SET status=excluded.status",
+        (habit_id, date, status)
+    )
+    if bitmaps.is_enabled(con):
+        bitmaps.update(con, [(habit_id, date, status)])
+
+@timed(rows=False)
+def set_entry(habit_id: int, date: str, status: str, wait: bool = True):
+    return write(_set_entry, habit_id, date, status, wait=wait,
+                 on_commit=_entries_changed(events.ENTRY_CHANGED, [date], habit_id=habit_id, date=date, status=status))
+
+def _set_entries(con, rows: Dict[Tuple[int, str], str]) -> Dict[str, int]:
+    result = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not rows:
+        return result
+    cur = con.executemany(
+        "INSERT OR IGNORE INTO entries (habit_id, date, status) VALUES (?, ?, ?)",
+        [(h, d, s) for (h, d), s in rows.items()]
+    )
+    result["inserted"] = cur.rowcount
+    # Только что вставленные строки уже имеют нужный статус и сюда не попадут
+    cur = con.executemany(
+        "UPDATE entries SET status=? WHERE habit_id=? AND date=? AND status<>?",
+        [(s, h, d, s) for (h, d), s in rows.items()]
+    )
+    result["updated"] = cur.rowcount
+    result["unchanged"] = len(rows) - result["inserted"] - result["updated"]
+    if bitmaps.is_enabled(con):
+        bitmaps.update(con, [(h, d, s) for (h, d), s in rows.items()])
+    return result
+
+@timed(rows=False)
+def set_entries(entries: Iterable[Tuple[int, str, str]], wait: bool = True) -> Dict[str, int]:
+    """
+    Массовая запись отметок (habit_id, date, status) одной транзакцией.
+    Для одинаковых (habit_id, date) побеждает последняя отметка.
+    Возвращает количество вставленных, изменённых и неизменённых строк.
+    """
+    rows = {}
+    for habit_id, ds, status in entries:
+        rows[(habit_id, ds)] = status
+    changed = [(h, d, s) for (h, d), s in rows.items()]
+    return write(_set_entries, rows, wait=wait, on_commit=_entries_changed(events.ENTRIES_CHANGED, {d for _, d, _ in changed}, entries=changed))
+
+def _entry_dicts(rows) -> List[Dict]:
+    return [{"id": r[0], "habit_id": r[1], "date": r[2], "status": r[3], "day": r[4]} for r in rows]
+
+def _entries_source(con, start: date) -> str:
+    # Архив нужен только запросам, которые начинаются раньше его границы
+    border = archive.horizon(con)
+    if border is not None and start < border:
+        return migrations.ALL_ENTRIES
+    return "entries"
 
-def get_all_habits() -> List[Dict]:
+@timed
+def get_entries_in_range(start_date: str, end_date: str, habit_id: int = None, status: str = None) -> List[Dict]:
+    """
+    Записи в полуинтервале [start_date, end_date). Фильтры по привычке и статусу
+    выполняются в SQL, диапазон идёт по индексу на целочисленном номере дня.
+    """
     con = get_conn()
-    cur = con.cursor()
-    cur.execute("SELECT id, name, color, start_date, end_date, status, notification_interval, last_notified FROM habits")
-    rows = cur.fetchall()
-    con.close()
-    return [{"id": r[0], "name": r[1], "color": r[2], "start_date": r[3], "end_date": r[4], "status": r[5], "notification_interval": r[6], "last_notified": r[7]} for r in rows]
+    start = str_to_date(start_date)
+    sql = f"SELECT id, habit_id, date, status, day FROM {_entries_source(con, start)} WHERE day >= ? AND day < ?"
+    params = [date_to_day(start), date_to_day(str_to_date(end_date))]
+    if habit_id is not None:
+        sql += " AND habit_id=?"
+        params.append(habit_id)
+    if status is not None:
+        sql += " AND status=?"
+        params.append(status)
+    return _entry_dicts(con.execute(sql, params).fetchall())
+
+@timed
+def get_entries_between(start_date: str, end_date: str, habit_id: int = None, status: str = None) -> List[Dict]:
+    # end_date включительно
+    end = date_to_str(str_to_date(end_date) + timedelta(days=1))
+    return get_entries_in_range(start_date, end, habit_id, status)
+
+@timed
+def get_entries_for_month(year: int, month: int, habit_id: int = None, status: str = None) -> List[Dict]:
+    start, end = month_bounds(year, month)
+    return get_entries_in_range(date_to_str(start), date_to_str(end), habit_id, status)
 
-def get_habit(hid: int) -> Dict:
+@timed
+def get_entries_for_year(year: int, habit_id: int = None, status: str = None) -> List[Dict]:
+    start, end = year_bounds(year)
+    return get_entries_in_range(date_to_str(start), date_to_str(end), habit_id, status)
+
+@timed
+def get_completion_grid(start_date: str, days: int = 7, habit_ids: Iterable[int] = None, status: str = "done") -> Dict[int, List[bool]]:
+    """
+    Сетка отметок за окно из days дней начиная с start_date: {habit_id: [bool] * days},
+    True — есть запись со статусом status. Один запрос по индексу дня на всё окно;
+    habit_ids ограничивает выборку (например, видимыми строками). Привычки без
+    отметок в окне в словарь не попадают.
+    """
     con = get_conn()
-    cur = con.cursor()
-    cur.execute("SELECT id, name, color, start_date, end_date, status, notification_interval, last_notified FROM habits WHERE id=?", (hid,))
-    r = cur.fetchone()
-    con.close()
-    if not r: return None
-    return {"id": r[0], "name": r[1], "color": r[2], "start_date": r[3], "end_date": r[4], "status": r[5], "notification_interval": r[6], "last_notified": r[7]}
-
-def set_entry(habit_id: int, date: str, status: str):
+    start = str_to_date(start_date)
+    first = date_to_day(start)
+    sql = f"SELECT habit_id, day FROM {_entries_source(con, start)} WHERE day >= ? AND day < ? AND status=?"
+    params = [first, first + days, status]
+    if habit_ids is not None:
+        habit_ids = list(habit_ids)
+        if not habit_ids:
+            return {}
+        sql += f" AND habit_id IN ({', '.join('?' * len(habit_ids))})"
+        params.extend(habit_ids)
+    grid = {}
+    for habit_id, day in con.execute(sql, params):
+        row = grid.get(habit_id)
+        if row is None:
+            row = grid[habit_id] = [False] * days
+        row[day - first] = True
+    return grid
+
+# Статусы, для которых есть сводные таблицы (см. migrations._entries_rollups).
+# Счётчики = сводка горячих записей + сводка архива
+ROLLUP_STATUSES = ("done", "skipped")
+
+_MONTH_COUNTS = """(
+    SELECT habit_id, year, month, done, skipped FROM entry_month_rollup
+    UNION ALL
+    SELECT habit_id, year, month, done, skipped FROM archived_month_summary
+)"""
+
+_WEEKDAY_COUNTS = """(
+    SELECT year, weekday, done, skipped FROM entry_weekday_rollup
+    UNION ALL
+    SELECT year, weekday, done, skipped FROM archived_weekday_summary
+)"""
+
+@timed
+def count_entries_by_month(year: int, status: str = "done") -> List[int]:
+    """Количество записей со статусом status по месяцам года (12 значений)."""
     con = get_conn()
-    cur = con.cursor()
-    cur.execute("SELECT id FROM entries WHERE habit_id=? AND date=?", (habit_id, date))
-    row = cur.fetchone()
-    if row:
-        cur.execute("UPDATE entries SET status=? WHERE id=?", (status, row[0]))
+    if status in ROLLUP_STATUSES:
+        rows = con.execute(
+            f"SELECT month, SUM({status}) FROM {_MONTH_COUNTS} WHERE year=? GROUP BY month",
+            (year,)
+        ).fetchall()
     else:
-        cur.execute("INSERT INTO entries (habit_id, date, status) VALUES (?, ?, ?)", (habit_id, date, status))
-    con.commit()
-    con.close()
+        start, end = year_bounds(year)
+        rows = con.execute(
+            f"SELECT CAST(substr(date, 6, 2) AS INTEGER), COUNT(*) FROM {_entries_source(con, start)} "
+            "WHERE day >= ? AND day < ? AND status=? GROUP BY 1",
+            (date_to_day(start), date_to_day(end), status)
+        ).fetchall()
+    counts = [0] * 12
+    for month, count in rows:
+        counts[month - 1] = count
+    return counts
 
-def get_entries_between(start_date: str, end_date: str) -> List[Dict]:
-    con = get_conn()
-    cur = con.cursor()
-    cur.execute("SELECT id, habit_id, date, status FROM entries WHERE date BETWEEN ? AND ?", (start_date, end_date))
-    rows = cur.fetchall()
-    con.close()
-    return [{"id": r[0], "habit_id": r[1], "date": r[2], "status": r[3]} for r in rows]
-
-def get_entries_for_month(year: int, month: int):
-    start = f"{year:04d}-{month:02d}-01"
-    # naive end - will be used by caller to compute last day or use SQLite date functions; for simplicity fetch month prefix
+@timed
+def count_entries_by_weekday(year: int, status: str = "done") -> List[int]:
+    """Количество записей со статусом status по дням недели (0 = понедельник)."""
     con = get_conn()
-    cur = con.cursor()
-    like = f"{year:04d}-{month:02d}-%"
-    cur.execute("SELECT id, habit_id, date, status FROM entries WHERE date LIKE ?", (like,))
-    rows = cur.fetchall()
-    con.close()
-    return [{"id": r[0], "habit_id": r[1], "date": r[2], "status": r[3]} for r in rows]
-
-def update_last_notified(habit_id: int, timestamp: float):
+    if status in ROLLUP_STATUSES:
+        rows = con.execute(
+            f"SELECT weekday, SUM({status}) FROM {_WEEKDAY_COUNTS} WHERE year=? GROUP BY weekday",
+            (year,)
+        ).fetchall()
+    else:
+        start, end = year_bounds(year)
+        rows = con.execute(
+            f"SELECT (day + 6) % 7, COUNT(*) FROM {_entries_source(con, start)} "
+            "WHERE day >= ? AND day < ? AND status=? GROUP BY 1",
+            (date_to_day(start), date_to_day(end), status)
+        ).fetchall()
+    counts = [0] * 7
+    for weekday, count in rows:
+        counts[weekday] = count
+    return counts
+
+@timed
+def count_entries_by_habit(year: int, status: str = "done") -> Dict[int, int]:
+    """Количество записей со статусом status за год по каждой привычке."""
+    if status not in ROLLUP_STATUSES:
+        raise ValueError(f"Нет сводной таблицы для статуса {status!r}")
+    rows = get_conn().execute(
+        f"SELECT habit_id, SUM({status}) FROM {_MONTH_COUNTS} WHERE year=? GROUP BY habit_id",
+        (year,)
+    ).fetchall()
+    return {habit_id: count for habit_id, count in rows}
+
+@timed(rows=False)
+def rebuild_rollups():
+    """Пересобрать сводные таблицы статистики из entries."""
+    write(migrations.rebuild_rollups)
+
+@timed(rows=False)
+def archive_entries(before: date) -> int:
+    """Перенести в архив записи с датой раньше before; вернуть число перенесённых строк."""
+    return write(archive.archive_before, before, on_commit=data_reloaded)
+
+@timed(rows=False)
+def archive_older_than(days: int) -> int:
+    """Архивировать всё, что старше days дней от сегодняшней даты."""
+    return archive_entries(date.today() - timedelta(days=days))
+
+def archive_stats() -> Dict[str, Any]:
+    """Размер горячей таблицы и архива, текущая граница архива."""
+    return archive.stats(get_conn())
+
+@timed(rows=False)
+def enable_bitmaps():
+    """Включить хранилище битовых карт (entry_bitmaps) и заполнить его из entries."""
+    write(bitmaps.enable)
+
+@timed(rows=False)
+def disable_bitmaps():
+    write(bitmaps.disable)
+
+@timed
+def get_done_bitmaps(year: int) -> Dict[int, bytes]:
+    """
+    Битовые карты выполнения за год: {habit_id: 46 байт}. Если хранилище не
+    включено, карты собираются из entries (результат тот же, но дороже).
+    """
     con = get_conn()
-    cur = con.cursor()
-    cur.execute("UPDATE habits SET last_notified=? WHERE id=?", (timestamp, habit_id))
-    con.commit()
-    con.close()
+    if bitmaps.is_enabled(con):
+        rows = con.execute("SELECT habit_id, bits FROM entry_bitmaps WHERE year=?", (year,)).fetchall()
+        return dict(rows)
+    return {habit_id: bits for (habit_id, _), bits in bitmaps.build(con, year).items()}
+
+def _update_last_notified(con, habit_id: int, timestamp: float):
+    con.execute("UPDATE habits SET last_notified=? WHERE id=?", (timestamp, habit_id))
 
+@timed(rows=False)
+def update_last_notified(habit_id: int, timestamp: float, wait: bool = True):
+    return write(_update_last_notified, habit_id, timestamp, wait=wait, on_commit=_last_notified_changed)
+
+@timed
 def get_entries_for_habit_on_date(habit_id: int, date: str) -> List[Dict]:
     """
     Получить все записи для привычки на конкретную дату
     """
-    con = get_conn()
-    cur = con.cursor()
-    cur.execute("SELECT id, habit_id, date, status FROM entries WHERE habit_id=? AND date=?", (habit_id, date))
-    rows = cur.fetchall()
-    con.close()
-    return [{"id": r[0], "habit_id": r[1], "date": r[2], "status": r[3]} for r in rows]
\ No newline at end of file
+    rows = get_conn().execute("SELECT id, habit_id, date, status, day FROM entries WHERE habit_id=? AND date=?", (habit_id, date)).fetchall()
+    return _entry_dicts(rows)
\ No newline at end of file
@@ -0,0 +1,76 @@
+# events.py
+# Шина событий об изменении данных. db.py публикует события после коммита
+# записи, вкладки подписываются и обновляют только затронутые элементы.
+#
+# Обработчики вызываются по порядку публикации в отдельном потоке "db-events",
+# чтобы долгий обработчик (перерисовка графика) не задерживал поток-писатель.
+import queue
+import threading
+
+# Типы событий и их данные (кроме них в каждом событии есть profile — имя профиля)
+ENTRY_CHANGED = "entry_changed"        # habit_id, date, status
+ENTRIES_CHANGED = "entries_changed"    # entries: [(habit_id, date, status), ...]
+HABIT_ADDED = "habit_added"            # habit_id
+HABIT_UPDATED = "habit_updated"        # habit_id, fields
+HABIT_DELETED = "habit_deleted"        # habit_id
+DATA_RELOADED = "data_reloaded"        # импорт, восстановление, архивация, смена профиля
+
+_lock = threading.Lock()
+# owner -> (handler, типы событий или None = все)
+_subscribers = {}
+_queue = queue.Queue()
+_thread = None
+
+
+def subscribe(owner, handler, kinds=None):
+    """
+    Подписать handler(kind, data) на события kinds (None — на все).
+    Подписка хранится по ключу owner: повторная подписка того же владельца
+    заменяет прежнюю — пересобранная вкладка не оставляет старых обработчиков.
+    """
+    with _lock:
+        _subscribers[owner] = (handler, frozenset(kinds) if kinds else None)
+
+
+def unsubscribe(owner):
+    with _lock:
+        _subscribers.pop(owner, None)
+
+
+def publish(kind, **data):
+    """Поставить событие в очередь рассылки; возвращается сразу."""
+    _ensure_thread()
+    _queue.put((kind, data))
+
+
+def flush(timeout: float = None):
+    """Дождаться рассылки всех уже опубликованных событий (служебные команды, проверки)."""
+    if threading.current_thread() is _thread:
+        return
+    done = threading.Event()
+    _ensure_thread()
+    _queue.put((None, done))
+    done.wait(timeout)
+
+
+def _ensure_thread():
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="db-events", daemon=True)
+            _thread.start()
+
+
+def _run():
+    while True:
+        kind, data = _queue.get()
+        if kind is None:
+            data.set()
+            continue
+        with _lock:
+            handlers = [h for h, kinds in _subscribers.values() if kinds is None or kind in kinds]
+        for handler in handlers:
+            try:
+                handler(kind, data)
+            except Exception as ex:
+                print(f"Ошибка обработчика события {kind}:", ex)
@@ -0,0 +1,183 @@
+# instrument.py
+# Инструментирование db.py: число вызовов, гистограмма задержек и число
+# возвращённых строк по каждой функции, плюс журнал медленных вызовов с SQL
+# и EXPLAIN QUERY PLAN выполненных в них запросов.
+import functools
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Вызов дольше SLOW_MS миллисекунд попадает в журнал медленных запросов
+SLOW_MS = 50.0
+# Переключается через set_enabled: вместе с флагом снимается и trace-callback
+enabled = True
+
+# Верхние границы корзин гистограммы, мс (последняя корзина — всё, что больше)
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500)
+
+_lock = threading.Lock()
+_stats = {}
+_slow = deque(maxlen=200)
+# стек списков SQL, выполненных текущим потоком внутри инструментированных вызовов
+_local = threading.local()
+# соединения, переданные в attach, — чтобы set_enabled мог снять или вернуть callback
+# (sqlite3.Connection не поддерживает weakref; закрытые вычищаются при attach)
+_connections = []
+
+def _bucket_labels():
+    labels = [f"<{b}ms" for b in BUCKETS_MS]
+    labels.append(f">={BUCKETS_MS[-1]}ms")
+    return labels
+
+def _trace_callback(con):
+    def trace(sql):
+        stack = getattr(_local, "stack", None)
+        if stack:
+            for queries in stack:
+                queries.append((con, sql))
+    return trace
+
+def attach(con: sqlite3.Connection):
+    """Подключить сбор SQL к соединению (вызывается для каждого нового соединения)."""
+    with _lock:
+        _connections[:] = [c for c in _connections if _is_open(c)]
+        _connections.append(con)
+        if enabled:
+            con.set_trace_callback(_trace_callback(con))
+
+def _is_open(con) -> bool:
+    try:
+        con.in_transaction
+    except sqlite3.ProgrammingError:
+        return False
+    return True
+
+def set_enabled(flag: bool):
+    """Включить или выключить инструментирование; выключенное не ставит trace-callback."""
+    global enabled
+    with _lock:
+        enabled = flag
+        _connections[:] = [c for c in _connections if _is_open(c)]
+        for con in _connections:
+            con.set_trace_callback(_trace_callback(con) if flag else None)
+
+def _record(name, elapsed_ms, rows):
+    with _lock:
+        s = _stats.get(name)
+        if s is None:
+            s = _stats[name] = {
+                "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                "histogram": [0] * (len(BUCKETS_MS) + 1),
+            }
+        s["calls"] += 1
+        s["total_ms"] += elapsed_ms
+        s["max_ms"] = max(s["max_ms"], elapsed_ms)
+        if rows is not None:
+            s["rows"] += rows
+        for i, bound in enumerate(BUCKETS_MS):
+            if elapsed_ms < bound:
+                s["histogram"][i] += 1
+                break
+        else:
+            s["histogram"][-1] += 1
+
+def _plans(queries):
+    result = []
+    seen = set()
+    for con, sql in queries:
+        # триггеры приходят строками "-- TRIGGER ...", записи уходят в поток-писатель
+        if sql in seen or not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            continue
+        seen.add(sql)
+        try:
+            plan = [row[-1] for row in con.execute("EXPLAIN QUERY PLAN " + sql)]
+        except sqlite3.Error as ex:
+            plan = [f"(план недоступен: {ex})"]
+        result.append({"sql": sql, "plan": plan})
+    return result
+
+def _log_slow(name, elapsed_ms, args, kwargs, queries):
+    entry = {
+        "function": name,
+        "ms": round(elapsed_ms, 3),
+        "args": repr(args)[:200] + (f" {kwargs!r}"[:200] if kwargs else ""),
+        "at": time.time(),
+        "queries": _plans(queries),
+    }
+    with _lock:
+        _slow.append(entry)
+
+def timed(fn=None, *, rows: bool = True):
+    """
+    Декоратор для функций db.py. rows=True — считать len() результата
+    (списки, кортежи, словари) как число возвращённых строк.
+    """
+    if fn is None:
+        return functools.partial(timed, rows=rows)
+    name = f"{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return fn(*args, **kwargs)
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        queries = []
+        stack.append(queries)
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stack.pop()
+        count = len(result) if rows and isinstance(result, (list, tuple, dict)) else None
+        _record(name, elapsed_ms, count)
+        if elapsed_ms >= SLOW_MS:
+            _log_slow(name, elapsed_ms, args, kwargs, queries)
+        return result
+    return wrapper
+
+def stats() -> dict:
+    """{имя функции: calls, total_ms, avg_ms, max_ms, rows, histogram}."""
+    labels = _bucket_labels()
+    with _lock:
+        return {
+            name: {
+                "calls": s["calls"],
+                "total_ms": round(s["total_ms"], 3),
+                "avg_ms": round(s["total_ms"] / s["calls"], 3),
+                "max_ms": round(s["max_ms"], 3),
+                "rows": s["rows"],
+                "histogram": dict(zip(labels, s["histogram"])),
+            }
+            for name, s in _stats.items()
+        }
+
+def slow_queries() -> list:
+    """Журнал медленных вызовов, от старых к новым."""
+    with _lock:
+        return list(_slow)
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _slow.clear()
+
+def report() -> str:
+    """Текстовая сводка для отладочной панели: самые затратные функции сверху."""
+    lines = [f"{'функция':<40} {'вызовы':>7} {'всего мс':>10} {'сред. мс':>9} {'макс. мс':>9} {'строк':>8}"]
+    for name, s in sorted(stats().items(), key=lambda item: -item[1]["total_ms"]):
+        lines.append(f"{name:<40} {s['calls']:>7} {s['total_ms']:>10.1f} {s['avg_ms']:>9.2f} {s['max_ms']:>9.2f} {s['rows']:>8}")
+    slow = slow_queries()
+    if slow:
+        lines.append("")
+        lines.append(f"Медленные вызовы (>= {SLOW_MS} мс): {len(slow)}")
+        for entry in slow[-20:]:
+            lines.append(f"{entry['function']} {entry['ms']:.1f} мс {entry['args']}")
+            for q in entry["queries"]:
+                lines.append(f"    {q['sql']}")
+                for step in q["plan"]:
+                    lines.append(f"        {step}")
+    return "\n".join(lines)
@@ -1,6 +1,8 @@
 import flet
 from flet import Page, Column, Row, ElevatedButton, Icons, Container, SnackBar, Text
 import db
+import events
+import writebehind
 from tabs import week_tab, month_tab, charts_tab, settings_tab
 import threading, time
 import datetime
@@ -13,6 +15,10 @@ except ImportError:
     print("Библиотека plyer не установлена. Установите: pip install plyer")
     PLYER_AVAILABLE = False
 
+def shutdown():
+    writebehind.flush_all(wait=True)
+    db.flush_writes()
+
 def main(page: Page):
     page.title = "Трекер привычек"
     page.horizontal_alignment = "stretch"
@@ -55,6 +61,10 @@ def main(page: Page):
     )
 
     def load_tab(i):
+        # подписка на события изменения данных есть только у видимой вкладки
+        events.unsubscribe("tab")
+        # отложенные отметки уходящей вкладки должны попасть в базу до чтения новой
+        writebehind.flush_all(wait=True)
         content_column.controls.clear()
         if i == 0:
             content_column.controls.append(week_tab.build_week_tab(page, refresh_main))
@@ -120,7 +130,8 @@ def main(page: Page):
                     if time_since_last >= secs:
                         print(f"Показываем уведомление для: {h['name']} (интервал: {interval})")
                         show_windows_notification(h)
-                        db.update_last_notified(h["id"], now)
+                        # не ждём коммита: запись уйдёт в очередь потока-писателя
+                        db.update_last_notified(h["id"], now, wait=False)
                     else:
                         print(f"Уведомление для '{h['name']}' скоро (через {secs - time_since_last:.0f} сек)")
                         
@@ -146,7 +157,16 @@ def main(page: Page):
 
     threading.Thread(target=notification_loop, daemon=True).start()
 
+    # Окно закрывается: дописываем отложенные отметки и очередь записи
+    def on_shutdown(e):
+        shutdown()
+
+    page.on_close = on_shutdown
+    page.on_disconnect = on_shutdown
+
     load_tab(0)
     page.add(layout)
 
-flet.app(target=main, assets_dir="data")
\ No newline at end of file
+flet.app(target=main, assets_dir="data")
+shutdown()
+db.close_all()
\ No newline at end of file
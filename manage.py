@@ -0,0 +1,103 @@
+# manage.py
+# Служебные команды: python manage.py <команда> [--db путь/к/habits.db]
+import argparse
+from datetime import date
+import db
+import snapshots
+
+
+def cmd_rebuild_rollups(args):
+    db.rebuild_rollups()
+    print("Сводные таблицы статистики пересобраны")
+
+
+def cmd_bitmaps(args):
+    if args.action == "enable":
+        db.enable_bitmaps()
+        print("Хранилище битовых карт включено")
+    else:
+        db.disable_bitmaps()
+        print("Хранилище битовых карт отключено")
+
+
+def cmd_archive(args):
+    if args.before:
+        moved = db.archive_entries(date.fromisoformat(args.before))
+    else:
+        moved = db.archive_older_than(args.days)
+    stats = db.archive_stats()
+    print(f"Перенесено в архив: {moved}; в entries: {stats['hot']}, в архиве: {stats['archived']}, граница: {stats['horizon']}")
+
+
+def cmd_profiles(args):
+    active = db.active_profile()
+    for name in db.list_profiles():
+        print(("* " if name == active else "  ") + name)
+
+
+def cmd_snapshot(args):
+    path = snapshots.create_snapshot(directory=args.dir, keep=args.keep)
+    print(f"Снимок создан: {path}")
+
+
+def cmd_snapshots(args):
+    for path in snapshots.list_snapshots(args.dir):
+        print(path)
+
+
+def cmd_restore(args):
+    previous = snapshots.restore_snapshot(args.path)
+    print(f"База восстановлена из {args.path}")
+    if previous:
+        print(f"Предыдущее состояние сохранено в {previous}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Служебные команды трекера привычек")
+    parser.add_argument("--db", help="путь к файлу базы (по умолчанию data/habits.db)")
+    parser.add_argument("--profile", help="профиль (база data/profiles/<имя>.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("rebuild-rollups", help="пересчитать сводные таблицы статистики с нуля")
+    p.set_defaults(func=cmd_rebuild_rollups)
+
+    p = sub.add_parser("bitmaps", help="включить/отключить хранилище битовых карт выполнения")
+    p.add_argument("action", choices=["enable", "disable"])
+    p.set_defaults(func=cmd_bitmaps)
+
+    p = sub.add_parser("archive", help="перенести старые записи в архив (статистика сохраняется в сводках)")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--days", type=int, default=365, help="архивировать записи старше стольких дней (по умолчанию 365)")
+    group.add_argument("--before", help="архивировать записи раньше даты YYYY-MM-DD")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("profiles", help="список профилей")
+    p.set_defaults(func=cmd_profiles)
+
+    p = sub.add_parser("snapshot", help="снять горячий снимок базы")
+    p.add_argument("--dir", help="каталог снимков (по умолчанию data/snapshots)")
+    p.add_argument("--keep", type=int, default=10, help="сколько последних снимков хранить")
+    p.set_defaults(func=cmd_snapshot)
+
+    p = sub.add_parser("snapshots", help="список снимков, от новых к старым")
+    p.add_argument("--dir", help="каталог снимков (по умолчанию data/snapshots)")
+    p.set_defaults(func=cmd_snapshots)
+
+    p = sub.add_parser("restore", help="восстановить базу из снимка")
+    p.add_argument("path", help="путь к файлу снимка")
+    p.set_defaults(func=cmd_restore)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        db.use_database(args.db)
+    if args.profile:
+        db.use_profile(args.profile)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
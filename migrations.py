@@ -0,0 +1,286 @@
+# migrations.py
+# Версионированные миграции схемы. Текущая версия хранится в PRAGMA user_version,
+# каждая миграция выполняется в своей транзакции ровно один раз.
+from datetime import datetime
+from connection import transaction
+
+def _initial_schema(con):
+    # habits: id, name, color, start_date, end_date, description
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS habits (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        color TEXT NOT NULL,
+        start_date TEXT,  -- YYYY-MM-DD or NULL
+        end_date TEXT,
+        status TEXT CHECK(status IN ('в процессе', 'выполнено', 'заброшено')) NOT NULL DEFAULT 'в процессе',
+        notification_interval TEXT,
+        last_notified REAL DEFAULT 0
+    )
+    """)
+    # entries: id, habit_id, date (YYYY-MM-DD), status (in_progress, done, skipped, overdue)
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        habit_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        status TEXT NOT NULL,
+        FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE
+    )
+    """)
+
+def _entries_indexes(con):
+    # Дубликаты (habit_id, date) могли появиться при импорте — оставляем последнюю запись
+    con.execute("""
+    DELETE FROM entries
+    WHERE id NOT IN (SELECT MAX(id) FROM entries GROUP BY habit_id, date)
+    """)
+    con.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_entries_habit_date ON entries(habit_id, date)")
+    con.execute("CREATE INDEX IF NOT EXISTS ix_entries_date_status ON entries(date, status)")
+
+def _entries_day_ordinal(con):
+    # Номер дня (date.toordinal()) рядом с текстовой датой: виртуальная колонка,
+    # вычисляется SQLite и не требует изменений в коде записи.
+    # julianday('0001-01-01') = 1721425.5, а date(1, 1, 1).toordinal() = 1
+    con.execute("""
+    ALTER TABLE entries ADD COLUMN day INTEGER
+        GENERATED ALWAYS AS (CAST(julianday(date) - 1721424.5 AS INTEGER)) VIRTUAL
+    """)
+    # Диапазонные запросы теперь идут по целым числам
+    con.execute("DROP INDEX IF EXISTS ix_entries_date_status")
+    con.execute("CREATE INDEX IF NOT EXISTS ix_entries_day_status ON entries(day, status)")
+
+# Сводные счётчики done/skipped поддерживаются триггерами на entries,
+# поэтому статистика не зависит от объёма истории
+_ROLLUP_STATUSES = "('done', 'skipped')"
+
+def _rollup_add_sql(row: str) -> str:
+    # row — NEW или OLD; для OLD добавляем со знаком минус.
+    # Строки с нераспознаваемой датой (day = NULL) в сводки не попадают
+    sign = "-" if row == "OLD" else "+"
+    return f"""
+        INSERT INTO entry_month_rollup (habit_id, year, month, done, skipped)
+        SELECT {row}.habit_id, CAST(substr({row}.date, 1, 4) AS INTEGER), CAST(substr({row}.date, 6, 2) AS INTEGER),
+               {sign}({row}.status = 'done'), {sign}({row}.status = 'skipped')
+        WHERE {row}.status IN {_ROLLUP_STATUSES} AND {row}.day IS NOT NULL
+        ON CONFLICT (habit_id, year, month) DO UPDATE
+            SET done = done + excluded.done, skipped = skipped + excluded.skipped;
+        INSERT INTO entry_weekday_rollup (year, weekday, done, skipped)
+        SELECT CAST(substr({row}.date, 1, 4) AS INTEGER), ({row}.day + 6) % 7,
+               {sign}({row}.status = 'done'), {sign}({row}.status = 'skipped')
+        WHERE {row}.status IN {_ROLLUP_STATUSES} AND {row}.day IS NOT NULL
+        ON CONFLICT (year, weekday) DO UPDATE
+            SET done = done + excluded.done, skipped = skipped + excluded.skipped;
+    """
+
+def rebuild_rollups(con):
+    """Пересчитать сводные таблицы по entries с нуля."""
+    con.execute("DELETE FROM entry_month_rollup")
+    con.execute("DELETE FROM entry_weekday_rollup")
+    con.execute(f"""
+    INSERT INTO entry_month_rollup (habit_id, year, month, done, skipped)
+    SELECT habit_id, CAST(substr(date, 1, 4) AS INTEGER), CAST(substr(date, 6, 2) AS INTEGER),
+           SUM(status = 'done'), SUM(status = 'skipped')
+    FROM entries WHERE status IN {_ROLLUP_STATUSES} AND day IS NOT NULL
+    GROUP BY 1, 2, 3
+    """)
+    con.execute(f"""
+    INSERT INTO entry_weekday_rollup (year, weekday, done, skipped)
+    SELECT CAST(substr(date, 1, 4) AS INTEGER), (day + 6) % 7,
+           SUM(status = 'done'), SUM(status = 'skipped')
+    FROM entries WHERE status IN {_ROLLUP_STATUSES} AND day IS NOT NULL
+    GROUP BY 1, 2
+    """)
+
+def create_rollup_triggers(con):
+    con.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS entries_rollup_insert AFTER INSERT ON entries
+    BEGIN {_rollup_add_sql("NEW")} END
+    """)
+    con.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS entries_rollup_delete AFTER DELETE ON entries
+    BEGIN {_rollup_add_sql("OLD")} END
+    """)
+    con.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS entries_rollup_update AFTER UPDATE OF habit_id, date, status ON entries
+    BEGIN {_rollup_add_sql("OLD")} {_rollup_add_sql("NEW")} END
+    """)
+
+def drop_rollup_triggers(con):
+    # на время массовой загрузки; после неё — rebuild_rollups() и create_rollup_triggers()
+    for name in ("entries_rollup_insert", "entries_rollup_delete", "entries_rollup_update"):
+        con.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+# Актуальный набор индексов entries (после всех миграций)
+def create_entry_indexes(con):
+    con.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_entries_habit_date ON entries(habit_id, date)")
+    con.execute("CREATE INDEX IF NOT EXISTS ix_entries_day_status ON entries(day, status)")
+
+def drop_entry_indexes(con):
+    con.execute("DROP INDEX IF EXISTS ux_entries_habit_date")
+    con.execute("DROP INDEX IF EXISTS ix_entries_day_status")
+
+def _parse_date(value):
+    # "2024-3-6", "2024-03-06 10:00", "2024-03-06T10:00" -> "2024-03-06"; иначе None
+    parts = str(value).strip().split()
+    if not parts:
+        return None
+    try:
+        return datetime.strptime(parts[0].split("T")[0], "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+def normalize_entry_dates(con) -> int:
+    """
+    Привести даты entries к YYYY-MM-DD. Старые set_entry и импорт JSON принимали
+    любую строку: у "2024-3-6" day = NULL, и запись не видна ни одному запросу
+    по дням. Распознанные даты переписываются (при совпадении с существующей
+    (habit_id, date) остаётся более поздняя запись, как в _entries_indexes),
+    нераспознанные удаляются. Возвращает число затронутых строк.
+    """
+    rows = con.execute(
+        "SELECT id, habit_id, date FROM entries WHERE date IS NOT strftime('%Y-%m-%d', date) ORDER BY id"
+    ).fetchall()
+    for entry_id, habit_id, value in rows:
+        iso = _parse_date(value)
+        if iso is None:
+            con.execute("DELETE FROM entries WHERE id=?", (entry_id,))
+            continue
+        existing = con.execute("SELECT id FROM entries WHERE habit_id=? AND date=?", (habit_id, iso)).fetchone()
+        if existing and existing[0] > entry_id:
+            con.execute("DELETE FROM entries WHERE id=?", (entry_id,))
+            continue
+        if existing:
+            con.execute("DELETE FROM entries WHERE id=?", (existing[0],))
+        con.execute("UPDATE entries SET date=? WHERE id=?", (iso, entry_id))
+    return len(rows)
+
+def _entries_rollups(con):
+    # иначе строки с day = NULL остались бы вне сводок навсегда
+    normalize_entry_dates(con)
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS entry_month_rollup (
+        habit_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        done INTEGER NOT NULL DEFAULT 0,
+        skipped INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (habit_id, year, month)
+    ) WITHOUT ROWID
+    """)
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS entry_weekday_rollup (
+        year INTEGER NOT NULL,
+        weekday INTEGER NOT NULL,  -- 0 = понедельник
+        done INTEGER NOT NULL DEFAULT 0,
+        skipped INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (year, weekday)
+    ) WITHOUT ROWID
+    """)
+    create_rollup_triggers(con)
+    rebuild_rollups(con)
+
+# Архив: старые записи переносятся из entries в entries_archive (см. archive.py),
+# их счётчики done/skipped хранятся в archived_*_summary и поддерживаются триггерами.
+# Пара (habit_id, date) находится только в одной из таблиц: запись на архивную дату
+# возвращает её в entries.
+def _summary_add_sql(row: str) -> str:
+    sign = "-" if row == "OLD" else "+"
+    return f"""
+        INSERT INTO archived_month_summary (habit_id, year, month, done, skipped)
+        SELECT {row}.habit_id, CAST(substr({row}.date, 1, 4) AS INTEGER), CAST(substr({row}.date, 6, 2) AS INTEGER),
+               {sign}({row}.status = 'done'), {sign}({row}.status = 'skipped')
+        WHERE {row}.status IN {_ROLLUP_STATUSES}
+        ON CONFLICT (habit_id, year, month) DO UPDATE
+            SET done = done + excluded.done, skipped = skipped + excluded.skipped;
+        INSERT INTO archived_weekday_summary (habit_id, year, weekday, done, skipped)
+        SELECT {row}.habit_id, CAST(substr({row}.date, 1, 4) AS INTEGER), ({row}.day + 6) % 7,
+               {sign}({row}.status = 'done'), {sign}({row}.status = 'skipped')
+        WHERE {row}.status IN {_ROLLUP_STATUSES}
+        ON CONFLICT (habit_id, year, weekday) DO UPDATE
+            SET done = done + excluded.done, skipped = skipped + excluded.skipped;
+    """
+
+# Все записи — горячие и архивные; подставляется вместо "entries" во FROM
+ALL_ENTRIES = """(
+    SELECT id, habit_id, date, status, day FROM entries
+    UNION ALL
+    SELECT id, habit_id, date, status, day FROM entries_archive
+)"""
+
+def create_archive_triggers(con):
+    con.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS entries_archive_insert AFTER INSERT ON entries_archive
+    BEGIN {_summary_add_sql("NEW")} END
+    """)
+    con.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS entries_archive_delete AFTER DELETE ON entries_archive
+    BEGIN {_summary_add_sql("OLD")} END
+    """)
+    # BEFORE: архивная строка должна исчезнуть раньше, чем сработают AFTER-триггеры entries
+    con.execute("""
+    CREATE TRIGGER IF NOT EXISTS entries_unarchive BEFORE INSERT ON entries
+    BEGIN DELETE FROM entries_archive WHERE habit_id = NEW.habit_id AND date = NEW.date; END
+    """)
+
+def drop_archive_triggers(con):
+    for name in ("entries_archive_insert", "entries_archive_delete", "entries_unarchive"):
+        con.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+def _entries_archive(con):
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS entries_archive (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        habit_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        status TEXT NOT NULL,
+        day INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 1721424.5 AS INTEGER)) VIRTUAL
+    )
+    """)
+    con.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_entries_archive_habit_date ON entries_archive(habit_id, date)")
+    con.execute("CREATE INDEX IF NOT EXISTS ix_entries_archive_day_status ON entries_archive(day, status)")
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS archived_month_summary (
+        habit_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        done INTEGER NOT NULL DEFAULT 0,
+        skipped INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (habit_id, year, month)
+    ) WITHOUT ROWID
+    """)
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS archived_weekday_summary (
+        habit_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        weekday INTEGER NOT NULL,  -- 0 = понедельник
+        done INTEGER NOT NULL DEFAULT 0,
+        skipped INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (habit_id, year, weekday)
+    ) WITHOUT ROWID
+    """)
+    # Служебные значения (граница архива и т.п.)
+    con.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    create_archive_triggers(con)
+
+# Порядок важен: номер версии = позиция в списке (начиная с 1)
+MIGRATIONS = [
+    _initial_schema,
+    _entries_indexes,
+    _entries_day_ordinal,
+    _entries_rollups,
+    _entries_archive,
+]
+
+def schema_version(con) -> int:
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(con):
+    """Применить все недостающие миграции."""
+    version = schema_version(con)
+    for target, step in enumerate(MIGRATIONS, start=1):
+        if version >= target:
+            continue
+        with transaction(con):
+            step(con)
+            con.execute(f"PRAGMA user_version = {target}")
@@ -9,6 +9,17 @@ def date_to_str(d: date) -> str:
 def str_to_date(s: str) -> date:
     return datetime.strptime(s, "%Y-%m-%d").date()
 
+def date_to_day(d: date) -> int:
+    # целочисленный номер дня, совпадает с колонкой entries.day
+    return d.toordinal()
+
+def day_to_date(day: int) -> date:
+    return date.fromordinal(day)
+
+def day_weekday(day: int) -> int:
+    # 0 = понедельник, как date.weekday()
+    return (day + 6) % 7
+
 def week_start(d: date) -> date:
     # неделя начинается с понедельника
     return d - timedelta(days=d.weekday())
@@ -16,6 +27,15 @@ def week_start(d: date) -> date:
 def week_dates(start: date):
     return [start + timedelta(days=i) for i in range(7)]
 
+def month_bounds(year: int, month: int):
+    # полуинтервал [первый день месяца, первый день следующего месяца)
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+def year_bounds(year: int):
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
 def month_name(month:int)->str:
     return calendar.month_name[month]
 
@@ -0,0 +1,144 @@
+# profiles.py
+# Профили: у каждого профиля своя база, свои соединения, поток-писатель и кэши.
+# Маршрутизатор выдаёт ресурсы активного профиля, открывает профили лениво
+# и закрывает давно не использовавшиеся.
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from cache import HabitCache, PeriodCache
+from connection import ConnectionManager
+from writer import WriteQueue
+
+DEFAULT_PROFILE = "default"
+_NAME_RE = re.compile(r"^[\w-]{1,64}$")
+
+
+class Profile:
+    """Открытый профиль: менеджер соединений, очередь записи, кэши привычек и периодов."""
+
+    def __init__(self, name: str, path: str, init_schema=None, on_connect=None, load_habits=None, bind=None):
+        self.name = name
+        self.path = path
+        self.manager = ConnectionManager(path, init_schema=init_schema, on_connect=on_connect)
+        self._bind = bind
+        self.writer = WriteQueue(self._writer_connection)
+        self.habits = HabitCache(lambda: load_habits(self.connection()))
+        self.periods = PeriodCache()
+
+    def connection(self):
+        return self.manager.connection()
+
+    def _writer_connection(self):
+        # Поток-писатель профиля работает только с этим профилем: вложенные
+        # вызовы db.* из операций записи должны попасть сюда же
+        if self._bind:
+            self._bind(self)
+        return self.manager.connection()
+
+    def close(self):
+        self.writer.close()
+        self.manager.close_all()
+        self.habits.invalidate()
+        self.periods.close()
+
+
+class ProfileRouter:
+    """
+    Профиль DEFAULT_PROFILE живёт в default_path, остальные — в directory/<имя>.db.
+    Открыто не больше max_open профилей: при превышении закрывается тот, к
+    которому дольше всего не обращались (кроме активного).
+    """
+
+    def __init__(self, default_path: str, directory: str, factory, max_open: int = 8):
+        self.default_path = default_path
+        self.directory = directory
+        # factory(name, path, bind) -> Profile
+        self._factory = factory
+        self.max_open = max_open
+        self._lock = threading.RLock()
+        self._open = OrderedDict()
+        self._active = DEFAULT_PROFILE
+        # профиль, закреплённый за потоком (потоки-писатели, with db.profile(...))
+        self._local = threading.local()
+
+    def path_for(self, name: str) -> str:
+        if name == DEFAULT_PROFILE:
+            return self.default_path
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Недопустимое имя профиля: {name!r}")
+        return os.path.join(self.directory, f"{name}.db")
+
+    def _bind(self, profile: Profile):
+        self._local.profile = profile
+
+    def get(self, name: str = None) -> Profile:
+        """Профиль по имени (по умолчанию — текущий), открывается при первом обращении."""
+        if name is None:
+            bound = getattr(self._local, "profile", None)
+            if bound is not None:
+                return bound
+            name = self._active
+        with self._lock:
+            profile = self._open.get(name)
+            if profile is not None:
+                self._open.move_to_end(name)
+                return profile
+            profile = self._factory(name, self.path_for(name), self._bind)
+            self._open[name] = profile
+            self._evict()
+            return profile
+
+    def _evict(self):
+        while len(self._open) > self.max_open:
+            name = next((n for n in self._open if n != self._active), None)
+            if name is None:
+                return
+            self._open.pop(name).close()
+
+    @property
+    def active(self) -> str:
+        return self._active
+
+    def activate(self, name: str):
+        self.path_for(name)  # проверка имени
+        with self._lock:
+            self._active = name
+
+    def pin(self, name: str):
+        """Закрепить профиль за текущим потоком (None — снять); возвращает прежний."""
+        previous = getattr(self._local, "profile", None)
+        self._local.profile = self.get(name) if name is not None else None
+        return previous
+
+    def unpin(self, previous):
+        self._local.profile = previous
+
+    def close(self, name: str = None):
+        """Закрыть профиль (по умолчанию — текущий); он откроется заново при следующем обращении."""
+        with self._lock:
+            profile = self._open.pop(name or self._active, None)
+        if profile is not None:
+            profile.close()
+
+    def close_all(self):
+        with self._lock:
+            opened = list(self._open.values())
+            self._open.clear()
+        for profile in opened:
+            profile.close()
+
+    def set_default_path(self, path: str):
+        self.close(DEFAULT_PROFILE)
+        self.default_path = path
+
+    def list_profiles(self):
+        """Имена профилей: профиль по умолчанию и все базы в directory."""
+        names = [DEFAULT_PROFILE]
+        if os.path.isdir(self.directory):
+            names += sorted(
+                n[:-3] for n in os.listdir(self.directory)
+                if n.endswith(".db") and _NAME_RE.match(n[:-3]) and n[:-3] != DEFAULT_PROFILE
+            )
+        return names
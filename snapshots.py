@@ -0,0 +1,96 @@
+# snapshots.py
+# Горячие снимки базы через онлайн-бэкап SQLite (sqlite3.Connection.backup)
+import os
+import sqlite3
+import time
+from datetime import datetime
+import db
+
+SNAPSHOT_SUFFIX = ".db"
+
+def snapshot_dir() -> str:
+    return os.path.join(os.path.dirname(db.db_path()), "snapshots")
+
+def snapshot_prefix() -> str:
+    # имя базы текущего профиля: habits-..., work-... — снимки профилей не смешиваются
+    return os.path.splitext(os.path.basename(db.db_path()))[0] + "-"
+
+def list_snapshots(directory: str = None):
+    """Пути к снимкам, от новых к старым."""
+    directory = directory or snapshot_dir()
+    if not os.path.isdir(directory):
+        return []
+    prefix = snapshot_prefix()
+    names = [
+        n for n in os.listdir(directory)
+        # за префиксом сразу идёт дата: снимки профиля "a" не путаются со снимками "a-b"
+        if n.startswith(prefix) and n[len(prefix):len(prefix) + 8].isdigit() and n.endswith(SNAPSHOT_SUFFIX)
+    ]
+    return [os.path.join(directory, n) for n in sorted(names, reverse=True)]
+
+def create_snapshot(directory: str = None, keep: int = 10, pages: int = 256, pause: float = 0.005, progress=None) -> str:
+    """
+    Скопировать базу постранично, по pages страниц за шаг с паузой pause между
+    шагами, пока приложение продолжает работать. Копирование идёт через
+    соединение потока-писателя: SQLite сам переносит в копию изменения,
+    сделанные этим соединением, и бэкап не начинается заново после каждой
+    записи. Писатель ждёт не дольше одного шага. После создания остаются
+    только keep последних снимков.
+    """
+    directory = directory or snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = f"{snapshot_prefix()}{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{SNAPSHOT_SUFFIX}"
+    path = os.path.join(directory, name)
+    tmp_path = path + ".tmp"
+    # Вести бэкап на соединении писателя из этого потока безопасно: соединение
+    # открыто с check_same_thread=False, SQLite собран в режиме serialized, и каждый
+    # шаг держит мьютекс соединения — запросы писателя идут между шагами, а не внутри.
+    # Пока у писателя открыта транзакция, шаг возвращает LOCKED и повторяется
+    # через sleep, так что незакоммиченные данные в копию не попадают.
+    source = db.write(lambda con: con)
+    target = sqlite3.connect(tmp_path)
+
+    def step(status, remaining, total):
+        # sleep в backup() ждёт только после BUSY/LOCKED; паузу между шагами делаем сами
+        if progress:
+            progress(total - remaining, total)
+        if remaining and pause:
+            time.sleep(pause)
+
+    try:
+        source.backup(target, pages=pages, progress=step, sleep=pause)
+        # снимок — самостоятельный файл, без WAL рядом
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+    os.replace(tmp_path, path)
+    prune_snapshots(directory, keep)
+    return path
+
+def prune_snapshots(directory: str = None, keep: int = 10):
+    for old in list_snapshots(directory)[keep:]:
+        os.remove(old)
+
+def restore_snapshot(path: str, backup_current: bool = True) -> str:
+    """
+    Восстановить базу из снимка. Очередь записи дорабатывается и все
+    соединения закрываются, затем снимок копируется поверх базы текущего профиля.
+    Если backup_current, перед этим снимается текущее состояние (его путь
+    возвращается — на случай, если восстановление нужно откатить).
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    previous = create_snapshot(keep=len(list_snapshots()) + 1) if backup_current else None
+    db_file = db.db_path()
+    db.close()
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(db_file)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    # снимок мог быть сделан до новых миграций
+    db.ensure_db()
+    db.data_reloaded()
+    return previous
@@ -6,8 +6,59 @@ from flet import (
 )
 from datetime import date
 import calendar
-from models import month_name, today, date_to_str
+from models import month_name, today, date_to_str, month_bounds
 import db
+import events
+
+def fill_day(tasks, overflow, day_entries, habits_by_id):
+    """Заполнить ячейку дня: до 4 выполненных привычек и счётчик остальных."""
+    tasks.controls.clear()
+    for entry in day_entries[:4]:
+        habit = habits_by_id.get(entry["habit_id"])
+        if habit:
+            tasks.controls.append(Container(
+                content=Text(
+                    habit["name"],
+                    size=10,
+                    weight="bold",
+                    color=Colors.WHITE
+                ),
+                padding=padding.symmetric(horizontal=4, vertical=2),
+                bgcolor=habit["color"],
+                border_radius=4,
+                alignment=alignment.center_left,
+            ))
+    overflow.value = f"+{len(day_entries) - 4}" if len(day_entries) > 4 else ""
+    overflow.visible = len(day_entries) > 4
+
+
+def shift_month(year, month, delta):
+    """(год, месяц), сдвинутые на delta месяцев."""
+    index = year * 12 + month - 1 + delta
+    return index // 12, index % 12 + 1
+
+
+def load_month(year, month):
+    """Выполненные отметки месяца по датам: {date: [записи]}."""
+    entries_map = {}
+    for e in db.get_entries_for_month(year, month, status="done"):
+        entries_map.setdefault(e["date"], []).append(e)
+    return entries_map
+
+
+def cached_month(year, month):
+    """load_month через кэш периодов: уже показанные месяцы не читаются заново."""
+    start, end = month_bounds(year, month)
+    return db.cached_period("month", start, end, lambda: load_month(year, month))
+
+
+def prefetch_months(year, month):
+    # соседние месяцы — в фоне, чтобы переход к ним не ждал запросов
+    for delta in (-1, 1):
+        y, m = shift_month(year, month, delta)
+        start, end = month_bounds(y, m)
+        db.prefetch_period("month", start, end, lambda y=y, m=m: load_month(y, m))
+
 
 def build_month_tab(page, refresh_main_callback):
     # State initialization
@@ -17,15 +68,7 @@ def build_month_tab(page, refresh_main_callback):
 
     def navigate_month(delta):
         """Navigate to previous/next month"""
-        year, month = page.month_year
-        month += delta
-        if month > 12:
-            month = 1
-            year += 1
-        elif month < 1:
-            month = 12
-            year -= 1
-        page.month_year = (year, month)
+        page.month_year = shift_month(*page.month_year, delta)
         refresh_main_callback()
 
     def set_today():
@@ -72,14 +115,12 @@ def build_month_tab(page, refresh_main_callback):
 
         # Get data
         habits = db.get_all_habits()
-        entries = db.get_entries_for_month(year, month)
-        
-        # Create entries map for quick lookup
-        # Create entries map (only completed habits)
-        entries_map = {}
-        for e in entries:
-            if e["status"] == "done":  # только отмеченные как выполненные
-                entries_map.setdefault(e["date"], []).append(e)
+        habits_by_id = {h["id"]: h for h in habits}
+        # только отмеченные как выполненные, по датам; уже показанные месяцы — из кэша
+        entries_map = cached_month(year, month)
+
+        # date -> (задачи, счётчик) ячейки: по событию обновляется только она
+        day_cells.clear()
 
         # Build calendar
         cal = calendar.Calendar(firstweekday=0)  # Monday first
@@ -154,35 +195,19 @@ def build_month_tab(page, refresh_main_callback):
                     padding=padding.symmetric(horizontal=2)
                 )
                 
+                # Show overflow indicator
+                overflow_text = Text(
+                    "",
+                    size=9,
+                    color=Colors.GREY_600,
+                    weight="bold"
+                )
                 # Add habit entries (max 4 for better visibility)
-                for entry in day_entries[:4]:
-                    habit = next((h for h in habits if h["id"] == entry["habit_id"]), None)
-                    if habit:
-                        task_block = Container(
-                            content=Text(
-                                habit["name"], 
-                                size=10,
-                                weight="bold",
-                                color=Colors.WHITE
-                            ),
-                            padding=padding.symmetric(horizontal=4, vertical=2),
-                            bgcolor=habit["color"],
-                            border_radius=4,
-                            alignment=alignment.center_left,
-                        )
-                        tasks_container.content.controls.append(task_block)
-                
+                fill_day(tasks_container.content, overflow_text, day_entries, habits_by_id)
+                day_cells[date_to_str(day_date)] = (tasks_container.content, overflow_text)
+
                 day_content.append(tasks_container)
-                
-                # Show overflow indicator
-                if len(day_entries) > 4:
-                    overflow_text = Text(
-                        f"+{len(day_entries) - 4}",
-                        size=9,
-                        color=Colors.GREY_600,
-                        weight="bold"
-                    )
-                    day_content.append(overflow_text)
+                day_content.append(overflow_text)
                 
                 # Day cell
                 day_cell = Container(
@@ -219,4 +244,34 @@ def build_month_tab(page, refresh_main_callback):
             )
         ], expand=True)
 
-    return build()
\ No newline at end of file
+    day_cells = {}
+
+    def refresh_days(dates):
+        dates = [ds for ds in dates if ds in day_cells]
+        if not dates:
+            return
+        habits_by_id = {h["id"]: h for h in db.get_all_habits()}
+        # один запрос на весь диапазон изменённых дат, а не по запросу на дату
+        by_date = {}
+        for e in db.get_entries_between(min(dates), max(dates), status="done"):
+            by_date.setdefault(e["date"], []).append(e)
+        for ds in dates:
+            tasks, overflow = day_cells[ds]
+            fill_day(tasks, overflow, by_date.get(ds, []), habits_by_id)
+            tasks.update()
+            overflow.update()
+
+    def on_data_event(kind, data):
+        if data.get("profile") != db.active_profile():
+            return
+        if kind == events.ENTRY_CHANGED:
+            refresh_days([data["date"]])
+        elif kind == events.ENTRIES_CHANGED:
+            refresh_days(sorted({ds for _, ds, _ in data["entries"]}))
+        else:
+            refresh_main_callback()
+
+    view = build()
+    events.subscribe("tab", on_data_event)
+    prefetch_months(*page.month_year)
+    return view
@@ -1,8 +1,12 @@
 # tabs/settings_view.py
-from flet import Column, Text, ElevatedButton, FilePicker, FilePickerResultEvent, Row, SnackBar
+from flet import Column, Text, TextField, ElevatedButton, FilePicker, FilePickerResultEvent, FilePickerFileType, Row, SnackBar, ProgressBar, Dropdown, dropdown
 import db
+import transfer
+import snapshots
+import instrument
 import json
 import os
+import threading
 
 def build_settings_tab(page, refresh_main_callback):
     # File pickers
@@ -38,93 +42,174 @@ def build_settings_tab(page, refresh_main_callback):
         # Let user choose where to save export file
         export_file_picker.save_file(
             dialog_title="Экспорт данных",
-            file_name="habits_export.json",
-            file_type="json"
+            file_name=f"habits_export{export_format_dd.value}",
         )
 
+    def set_progress(done, total):
+        progress_bar.value = done / total if total else None
+        progress_text.value = f"{done} из {total} записей"
+        page.update()
+
     def export_data_to_file(file_path):
-        # dump habits and entries to JSON
-        import sqlite3
-        con = sqlite3.connect(db.DB_PATH)
-        cur = con.cursor()
-        cur.execute("SELECT id, name, color, start_date, end_date, status, notification_interval FROM habits")
-        habits = [dict(zip(["id","name","color","start_date","end_date","status", "notification_interval"], r)) for r in cur.fetchall()]
-        cur.execute("SELECT id, habit_id, date, status FROM entries")
-        entries = [dict(zip(["id","habit_id","date","status"], r)) for r in cur.fetchall()]
-        con.close()
-        export = {"habits": habits, "entries": entries}
-        
-        try:
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(export, f, ensure_ascii=False, indent=2)
-            show_snack_bar(f"Данные экспортированы в {file_path}")
-        except Exception as ex:
-            show_snack_bar(f"Ошибка экспорта: {str(ex)}")
+        # Экспорт идёт в фоновом потоке и пишет файл порциями — UI не замирает
+        def run():
+            progress_bar.visible = True
+            set_progress(0, 0)
+            try:
+                counts = transfer.export_data(file_path, progress=set_progress)
+                skipped = f", пропущено с неверной датой: {counts['skipped']}" if counts.get("skipped") else ""
+                show_snack_bar(f"Данные экспортированы в {file_path} ({counts['entries']} записей{skipped})")
+            except Exception as ex:
+                show_snack_bar(f"Ошибка экспорта: {str(ex)}")
+            finally:
+                progress_bar.visible = False
+                progress_text.value = ""
+                page.update()
+
+        threading.Thread(target=run, daemon=True).start()
 
     def import_data(e):
         # Let user choose file to import
         import_file_picker.pick_files(
             dialog_title="Импорт данных",
-            file_type="json",
+            file_type=FilePickerFileType.CUSTOM,
+            allowed_extensions=["json", "ndjson", "jsonl", "gz", "hbk"],
             allow_multiple=False
         )
 
+    def set_import_progress(stats):
+        progress_bar.value = stats["fraction"]
+        progress_text.value = f"{stats['rows']} строк, {stats['rows_per_sec']:.0f} строк/с"
+        page.update()
+
     def import_data_from_file(file_path):
+        if not os.path.exists(file_path):
+            show_snack_bar(f"Файл не найден: {file_path}")
+            return
+
+        # Импорт разбирает файл потоково и пишет порциями в одной транзакции, в фоне
+        def run():
+            progress_bar.visible = True
+            progress_bar.value = 0
+            page.update()
+            try:
+                stats = transfer.import_data(file_path, progress=set_import_progress, mode=import_mode_dd.value)
+                if import_mode_dd.value == "merge":
+                    summary = f"добавлено {stats['inserted']}, изменено {stats['updated']}, без изменений {stats['unchanged']}"
+                else:
+                    summary = f"{stats['entries']} записей"
+                show_snack_bar(
+                    f"Импорт завершён успешно: {summary} за {stats['seconds']:.1f} с"
+                    + (f", пропущено некорректных строк: {stats['rejected']}" if stats["rejected"] else "")
+                )
+                refresh_main_callback()
+            except json.JSONDecodeError:
+                show_snack_bar("Ошибка: файл имеет неверный формат JSON")
+            except Exception as ex:
+                show_snack_bar(f"Ошибка импорта: {str(ex)}")
+            finally:
+                progress_bar.visible = False
+                progress_text.value = ""
+                page.update()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def take_snapshot(e):
+        # Онлайн-бэкап идёт шагами и не останавливает приложение
+        def run():
+            try:
+                path = snapshots.create_snapshot()
+                show_snack_bar(f"Снимок базы сохранён: {path}")
+            except Exception as ex:
+                show_snack_bar(f"Ошибка создания снимка: {str(ex)}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def switch_profile(e):
+        # у каждого профиля своя база; вкладки перечитают данные уже из неё
+        db.use_profile(profile_dd.value)
+        show_snack_bar(f"Профиль: {profile_dd.value}")
+        refresh_main_callback()
+
+    def create_profile(e):
+        name = (new_profile_input.value or "").strip()
         try:
-            if not os.path.exists(file_path):
-                show_snack_bar(f"Файл не найден: {file_path}")
-                return
-            
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            con = db.get_conn()
-            cur = con.cursor()
-            
-            # Clear existing data before import
-            cur.execute("DELETE FROM entries")
-            cur.execute("DELETE FROM habits")
-            
-            # Import habits
-            for h in data.get("habits", []):
-                cur.execute("""
-                    INSERT INTO habits (id, name, color, start_date, end_date, status, notification_interval) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    h.get("id"), h.get("name"), h.get("color"), 
-                    h.get("start_date"), h.get("end_date"), 
-                    h.get("status", 'в процессе'), h.get("notification_interval", "Без уведомлений")
-                ))
-            
-            # Import entries
-            for en in data.get("entries", []):
-                cur.execute("""
-                    INSERT INTO entries (id, habit_id, date, status) 
-                    VALUES (?, ?, ?, ?)
-                """, (
-                    en.get("id"), en.get("habit_id"), 
-                    en.get("date"), en.get("status")
-                ))
-            
-            con.commit()
-            con.close()
-            
-            show_snack_bar("Импорт завершён успешно")
-            refresh_main_callback()
-            
-        except json.JSONDecodeError:
-            show_snack_bar("Ошибка: файл имеет неверный формат JSON")
-        except Exception as ex:
-            show_snack_bar(f"Ошибка импорта: {str(ex)}")
+            db.use_profile(name)
+            db.ensure_db()
+        except ValueError as ex:
+            show_snack_bar(str(ex))
+            return
+        show_snack_bar(f"Создан профиль {name}")
+        refresh_main_callback()
+
+    def show_query_stats(e):
+        debug_text.value = instrument.report() if instrument.stats() else "Вызовов db пока не было"
+        debug_text.visible = True
+        page.update()
+
+    def reset_query_stats(e):
+        instrument.reset()
+        debug_text.value = ""
+        debug_text.visible = False
+        page.update()
+
+    profile_dd = Dropdown(
+        label="Профиль",
+        options=[dropdown.Option(name, name) for name in db.list_profiles()],
+        value=db.active_profile(),
+        on_change=switch_profile,
+        width=200,
+    )
+    new_profile_input = TextField(label="Новый профиль", width=200)
+
+    export_format_dd = Dropdown(
+        label="Формат экспорта",
+        options=[
+            dropdown.Option(".json", "JSON"),
+            dropdown.Option(".json.gz", "JSON (gzip)"),
+            dropdown.Option(".ndjson", "NDJSON"),
+            dropdown.Option(".ndjson.gz", "NDJSON (gzip)"),
+            dropdown.Option(".hbk", "Бинарный (.hbk, быстрый)"),
+        ],
+        value=".json",
+        width=200,
+    )
+    import_mode_dd = Dropdown(
+        label="Режим импорта",
+        options=[
+            dropdown.Option("replace", "Заменить данные"),
+            dropdown.Option("merge", "Объединить с текущими"),
+        ],
+        value="replace",
+        width=220,
+    )
+    progress_bar = ProgressBar(width=400, visible=False)
+    progress_text = Text("", size=12)
+    debug_text = Text("", size=11, font_family="monospace", selectable=True, visible=False)
 
     return Column([
         Text("Настройки", size=20, weight="bold"),
         Row([
+            profile_dd,
+            new_profile_input,
+            ElevatedButton("Создать профиль", on_click=create_profile),
+        ]),
+        Row([
+            export_format_dd,
             ElevatedButton("Экспорт данных", on_click=export_data),
+            import_mode_dd,
             ElevatedButton("Импорт данных", on_click=import_data),
+            ElevatedButton("Снимок базы", on_click=take_snapshot),
+        ]),
+        progress_bar,
+        progress_text,
+        Text("Экспорт: сохраняет все привычки и записи в JSON / NDJSON файл (опционально сжатый gzip) или в компактный бинарный .hbk", size=12),
+        Text("Снимок базы: копия data/habits.db в data/snapshots (хранятся 10 последних, восстановление — python manage.py restore)", size=12),
+        Text("Импорт: загружает данные из JSON / NDJSON файла, в том числе сжатого gzip: заменяет текущие данные или объединяет с ними, записывая только изменения", size=12),
+        Text("Отладка", size=16, weight="bold"),
+        Row([
+            ElevatedButton("Статистика запросов", on_click=show_query_stats),
+            ElevatedButton("Сбросить статистику", on_click=reset_query_stats),
         ]),
-        Text("Экспорт: сохраняет все привычки и записи в JSON файл", size=12),
-        Text("Импорт: загружает данные из JSON файла (заменяет текущие)", size=12),
-    ])
\ No newline at end of file
+        debug_text,
+    ], scroll="auto", expand=True)
\ No newline at end of file
@@ -6,46 +6,98 @@ from flet import (
     TextField, Dropdown, dropdown, TextButton, SnackBar,
     Colors, MainAxisAlignment, ScrollMode, CrossAxisAlignment
 )
-from models import date_to_str, today, week_dates
+from models import date_to_str, str_to_date, date_to_day, today, week_dates
 import db
+import events
+from writebehind import EntryWriteBehind
 
 
-def get_week_habits(start_date):
-    habits = db.get_all_habits()
+# Сколько строк привычек строится за раз; остальные — на следующих страницах
+ROWS_PER_PAGE = 50
+
+
+def get_active_habits(start_date):
+    """Привычки, период которых пересекается с неделей (без отметок)."""
     week_days = week_dates(start_date)
     result = []
-    for habit in habits:
+    for habit in db.get_all_habits():
         try:
             start = datetime.datetime.strptime(habit["start_date"], "%Y-%m-%d").date() if habit["start_date"] else datetime.date.min
             end = datetime.datetime.strptime(habit["end_date"], "%Y-%m-%d").date() if habit["end_date"] else datetime.date.max
             if start <= week_days[-1] and end >= week_days[0]:
-                entries = db.get_entries_between(date_to_str(week_days[0]), date_to_str(week_days[-1]))
-                days = [False] * 7
-                for i, day in enumerate(week_days):
-                    ds = date_to_str(day)
-                    for entry in entries:
-                        if entry["habit_id"] == habit["id"] and entry["date"] == ds and entry["status"] == "done":
-                            days[i] = True
-                result.append({
-                    "name": habit["name"],
-                    "id": habit["id"],
-                    "color": habit["color"],
-                    "days": days,
-                    "status": habit["status"],
-                    "notification_interval": habit.get("notification_interval", "Без уведомлений")
-                })
+                result.append(habit)
         except (ValueError, TypeError):
             continue
     return result
 
 
+def get_week_habits(start_date, offset=0, limit=None, habits=None):
+    """
+    Строки недели с отметками за 7 дней. offset/limit — окно строк: отметки
+    читаются одним запросом только для привычек этого окна.
+    habits — уже отобранный get_active_habits список, чтобы не отбирать заново.
+    """
+    if habits is None:
+        habits = get_active_habits(start_date)
+    if offset or limit is not None:
+        habits = habits[offset:None if limit is None else offset + limit]
+        habit_ids = [h["id"] for h in habits]
+    else:
+        habit_ids = None
+    # отметки "выполнено" за всю неделю — сеткой habit_id -> 7 флагов
+    grid = db.get_completion_grid(date_to_str(start_date), 7, habit_ids=habit_ids)
+    return [
+        {
+            "name": habit["name"],
+            "id": habit["id"],
+            "color": habit["color"],
+            "days": grid.get(habit["id"], [False] * 7),
+            "status": habit["status"],
+            "notification_interval": habit.get("notification_interval", "Без уведомлений")
+        }
+        for habit in habits
+    ]
+
+
+def load_week_page(start_date, page_index):
+    """Страница строк недели: (всего привычек, номер страницы в допустимых пределах, строки)."""
+    active = get_active_habits(start_date)
+    pages = max(1, -(-len(active) // ROWS_PER_PAGE))
+    page_index = min(page_index, pages - 1)
+    return len(active), page_index, get_week_habits(start_date, page_index * ROWS_PER_PAGE, ROWS_PER_PAGE, habits=active)
+
+
+def cached_week_page(start_date, page_index):
+    """load_week_page через кэш периодов: уже показанные недели не читаются заново."""
+    end = start_date + datetime.timedelta(days=7)
+    return db.cached_period("week", start_date, end, lambda: load_week_page(start_date, page_index), page_index)
+
+
+def prefetch_weeks(start_date, page_index):
+    # соседние недели — в фоне, чтобы стрелки навигации открывали их сразу
+    for delta in (-7, 7):
+        start = start_date + datetime.timedelta(days=delta)
+        end = start + datetime.timedelta(days=7)
+        db.prefetch_period("week", start, end, lambda start=start: load_week_page(start, page_index), page_index)
+
+
 def build_week_tab(page, refresh_main_callback):
     current_week_start = [datetime.date.today() - datetime.timedelta(days=datetime.date.today().weekday())]
+    # (habit_id, индекс дня) -> Checkbox текущей отрисовки: для точечных обновлений по событиям
+    cells = {}
+    # номер страницы строк привычек
+    row_page = [0]
 
     def refresh_view():
+        # Сначала дописываем отложенные отметки, иначе новая сетка прочитает
+        # из базы состояние без них
+        pending_writes.flush(wait=True)
         week_start = current_week_start[0]
         week_days = [(week_start + datetime.timedelta(days=i)) for i in range(7)]
-        habits = get_week_habits(week_start)
+        # Контролы строятся только для строк текущей страницы
+        total, row_page[0], habits = cached_week_page(week_start, row_page[0])
+        pages = max(1, -(-total // ROWS_PER_PAGE))
+        first_row = row_page[0] * ROWS_PER_PAGE
         
         # Определяем сегодняшнюю дату
         today_date = datetime.date.today()
@@ -76,6 +128,7 @@ def build_week_tab(page, refresh_main_callback):
 
         # Строки с привычками
         habit_rows = []
+        cells.clear()
         if habits:
             for habit in habits:
                 # Определяем цвет текста в зависимости от статуса
@@ -137,10 +190,10 @@ def build_week_tab(page, refresh_main_callback):
                         ),
                         *[
                             Container(
-                                Checkbox(
+                                cells.setdefault((habit["id"], i), Checkbox(
                                     value=habit["days"][i],
                                     on_change=lambda e, day_idx=i, h_id=habit["id"]: checkbox_changed(e, day_idx, h_id)
-                                ),
+                                )),
                                 alignment=alignment.center,
                                 expand=True,
                                 bgcolor=Colors.BLUE_50 if week_days[i] == today_date else Colors.TRANSPARENT,  # Выделяем сегодняшний день
@@ -179,29 +232,74 @@ def build_week_tab(page, refresh_main_callback):
             spacing=10,
         )
 
+        # Переключатель страниц строк — только если привычки не помещаются на одну
+        page_row = []
+        if pages > 1:
+            page_row.append(Row(
+                [
+                    IconButton(Icons.CHEVRON_LEFT, on_click=prev_rows, disabled=row_page[0] == 0),
+                    Text(f"Привычки {first_row + 1}–{first_row + len(habits)} из {total}", size=13),
+                    IconButton(Icons.CHEVRON_RIGHT, on_click=next_rows, disabled=row_page[0] >= pages - 1),
+                ],
+                alignment=MainAxisAlignment.CENTER,
+            ))
+
         # Основной контейнер
         content.controls.clear()
-        content.controls.append(Column([nav_row, header_row, *habit_rows], spacing=8))
+        content.controls.append(Column([nav_row, header_row, *habit_rows, *page_row], spacing=8))
         page.update()
+        prefetch_weeks(week_start, row_page[0])
+
+    def cell_for(habit_id, ds):
+        offset = date_to_day(str_to_date(ds)) - date_to_day(current_week_start[0])
+        return cells.get((habit_id, offset))
+
+    def rollback(failed, error):
+        # Пачка отметок не записалась: возвращаем чекбоксы в исходное состояние
+        for (habit_id, ds), original in failed.items():
+            checkbox = cell_for(habit_id, ds)
+            if checkbox is not None and original is not None:
+                checkbox.value = original
+                try:
+                    checkbox.update()
+                except Exception:
+                    pass  # вкладку уже перестроили
+        page.snack_bar = SnackBar(content=Text(f"Не удалось сохранить отметки ({len(failed)}): {error}"))
+        page.snack_bar.open = True
+        page.update()
+
+    # Отметки применяются в интерфейсе сразу, а пишутся пачкой после паузы в кликах
+    pending_writes = EntryWriteBehind(delay=0.3, on_error=rollback)
 
     # Обработчик изменения чекбокса
     def checkbox_changed(e, day_idx, habit_id):
-        week_start = current_week_start[0]
-        week_days = [(week_start + datetime.timedelta(days=i)) for i in range(7)]
-        ds = date_to_str(week_days[day_idx])
-        status = "done" if e.control.value else "skipped"
-        db.set_entry(habit_id, ds, status)
-        
-        # Определяем статус
+        ds = date_to_str(current_week_start[0] + datetime.timedelta(days=day_idx))
         status = "done" if e.control.value else "skipped"
-        db.set_entry(habit_id, ds, status)
-        
-        # Обновляем только текущий view
-        refresh_view()
-                    
-        page.snack_bar = SnackBar(content=Text(f"Статус обновлён для {ds}"))
-        page.snack_bar.open = True
-        page.update()
+        # Клиент уже показывает новое состояние чекбокса: сетку не перестраиваем,
+        # страницу целиком не обновляем и коммита не ждём
+        pending_writes.set(habit_id, ds, status, original=not e.control.value)
+
+    def apply_entry(habit_id, ds, status):
+        # Отметка из другого места приложения: меняем только её чекбокс.
+        # Пока есть незаписанное изменение этой отметки, событие о ней устарело
+        if pending_writes.is_pending(habit_id, ds):
+            return
+        checkbox = cell_for(habit_id, ds)
+        if checkbox is not None and checkbox.value != (status == "done"):
+            checkbox.value = status == "done"
+            checkbox.update()
+
+    def on_data_event(kind, data):
+        if data.get("profile") != db.active_profile():
+            return
+        if kind == events.ENTRY_CHANGED:
+            apply_entry(data["habit_id"], data["date"], data["status"])
+        elif kind == events.ENTRIES_CHANGED:
+            for habit_id, ds, status in data["entries"]:
+                apply_entry(habit_id, ds, status)
+        else:
+            # изменился набор привычек или данные целиком — строки строятся заново
+            refresh_view()
 
     # Обработчики кнопок
     def prev_week(e):
@@ -216,6 +314,14 @@ def build_week_tab(page, refresh_main_callback):
         current_week_start[0] = datetime.date.today() - datetime.timedelta(days=datetime.date.today().weekday())
         refresh_view()
 
+    def prev_rows(e):
+        row_page[0] = max(0, row_page[0] - 1)
+        refresh_view()
+
+    def next_rows(e):
+        row_page[0] += 1
+        refresh_view()
+
     def add_habit(e):
         try:
             # Очищаем overlay от предыдущих диалогов
@@ -278,16 +384,10 @@ def build_week_tab(page, refresh_main_callback):
                         "notification_interval": notification_input.value
                     })
 
-                    # Закрываем диалог
+                    # Закрываем диалог; список привычек обновится по событию HABIT_ADDED
                     dialog.open = False
                     page.update()
 
-                    # После закрытия обновляем список привычек
-                    refresh_view()
-                    # Обновляем другие вкладки
-                    if refresh_main_callback:
-                        refresh_main_callback()
-
                 except Exception as ex:
                     page.snack_bar = SnackBar(content=Text(f"Ошибка сохранения: {str(ex)}"))
                     page.snack_bar.open = True
@@ -389,17 +489,10 @@ def build_week_tab(page, refresh_main_callback):
                     }
                     db.update_habit(habit["id"], fields)
 
-                    # Закрываем диалог
+                    # Закрываем диалог; строка привычки обновится по событию HABIT_UPDATED
                     dialog.open = False
                     page.update()
 
-                    # Обновляем вид
-                    refresh_view()
-                    # Обновляем другие вкладки
-                    if refresh_main_callback:
-                        refresh_main_callback()
-                    page.update()
-
                 except Exception as ex:
                     page.snack_bar = SnackBar(content=Text(f"Ошибка сохранения: {str(ex)}"))
                     page.snack_bar.open = True
@@ -437,10 +530,6 @@ def build_week_tab(page, refresh_main_callback):
                 db.delete_habit(habit["id"])
                 dialog.open = False
                 page.update()
-                refresh_view()
-                # Обновляем другие вкладки
-                if refresh_main_callback:
-                    refresh_main_callback()
                 page.snack_bar = SnackBar(content=Text("Привычка удалена"))
                 page.snack_bar.open = True
                 page.update()
@@ -471,6 +560,7 @@ def build_week_tab(page, refresh_main_callback):
     # Основная колонка контента
     content = Column(scroll="auto", expand=True, spacing=10)
     refresh_view()
+    events.subscribe("tab", on_data_event)
 
     return Container(
         content,
@@ -0,0 +1,62 @@
+# Миграции поверх базы, созданной исходной версией приложения (до migrations.py)
+import sqlite3
+
+import migrations
+
+# Схема из ensure_db() исходного db.py
+BASELINE_SCHEMA = """
+CREATE TABLE habits (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    color TEXT NOT NULL,
+    start_date TEXT,
+    end_date TEXT,
+    status TEXT CHECK(status IN ('в процессе', 'выполнено', 'заброшено')) NOT NULL DEFAULT 'в процессе',
+    notification_interval TEXT,
+    last_notified REAL DEFAULT 0
+);
+CREATE TABLE entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    habit_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE
+);
+"""
+
+
+def baseline_db(path, entries):
+    con = sqlite3.connect(path, isolation_level=None)
+    con.executescript(BASELINE_SCHEMA)
+    con.execute("INSERT INTO habits (name, color) VALUES ('a', 'red')")
+    con.executemany("INSERT INTO entries (habit_id, date, status) VALUES (1, ?, ?)", entries)
+    return con
+
+
+def test_baseline_db_with_non_iso_dates_migrates(tmp_path):
+    con = baseline_db(tmp_path / "habits.db", [
+        ("2024-3-6", "done"),           # 2024-03-06, среда
+        ("2024-03-07", "done"),
+        ("2024-3-7", "skipped"),        # та же дата позже — остаётся она
+        ("2024-03-08 10:00", "done"),
+        ("не дата", "done"),            # удаляется
+    ])
+    migrations.migrate(con)
+
+    assert migrations.schema_version(con) == len(migrations.MIGRATIONS)
+    rows = con.execute("SELECT date, status FROM entries ORDER BY date").fetchall()
+    assert rows == [("2024-03-06", "done"), ("2024-03-07", "skipped"), ("2024-03-08", "done")]
+    assert con.execute("SELECT COUNT(*) FROM entries WHERE day IS NULL").fetchone()[0] == 0
+    month = con.execute("SELECT done, skipped FROM entry_month_rollup WHERE habit_id=1 AND year=2024 AND month=3").fetchone()
+    assert month == (2, 1)
+    weekdays = dict(con.execute("SELECT weekday, done + skipped FROM entry_weekday_rollup WHERE year=2024").fetchall())
+    assert weekdays == {2: 1, 3: 1, 4: 1}
+
+
+def test_non_iso_date_insert_does_not_break_rollups(tmp_path):
+    con = baseline_db(tmp_path / "habits.db", [("2024-03-06", "done")])
+    migrations.migrate(con)
+
+    con.execute("INSERT INTO entries (habit_id, date, status) VALUES (1, '2024-3-9', 'done')")
+    con.execute("DELETE FROM entries WHERE date = '2024-3-9'")
+    assert con.execute("SELECT SUM(done) FROM entry_month_rollup").fetchone()[0] == 1
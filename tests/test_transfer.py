@@ -0,0 +1,68 @@
+# Экспорт и импорт через transfer.py
+import pytest
+
+import db
+import transfer
+
+
+@pytest.fixture
+def database(tmp_path):
+    original = db.DB_PATH
+    db.use_database(str(tmp_path / "habits.db"))
+    yield tmp_path
+    db.close_all()
+    db.use_database(original)
+
+
+def all_entries():
+    return sorted((e["habit_id"], e["date"], e["status"]) for e in db.get_entries_between("2000-01-01", "2100-01-01"))
+
+
+def test_hbk_round_trip_skips_rows_without_day(database):
+    habit_id = db.add_habit({"name": "a", "color": "red", "status": "в процессе"})
+    db.set_entries([(habit_id, "2024-03-06", "done"), (habit_id, "2024-03-08", "skipped")])
+    db.set_entry(habit_id, "2024-3-7", "done")  # day = NULL: в .hbk не представима
+    expected = all_entries()
+
+    path = str(database / "backup.hbk")
+    counts = transfer.export_data(path)
+    assert counts == {"habits": 1, "entries": 2, "skipped": 1}
+
+    imported = transfer.import_data(path)
+    assert imported["entries"] == 2
+    assert all_entries() == expected
+    assert [h["name"] for h in db.get_all_habits()] == ["a"]
+
+
+def entry_ids():
+    return sorted(tuple(r) for r in db.get_conn().execute("SELECT id, habit_id, date, status FROM entries"))
+
+
+def test_json_round_trip_keeps_entry_ids(database):
+    habit_id = db.add_habit({"name": "a", "color": "red", "status": "в процессе"})
+    db.set_entries([(habit_id, "2024-03-06", "done"), (habit_id, "2024-03-07", "done"), (habit_id, "2024-03-08", "done")])
+    db.write(lambda con: con.execute("DELETE FROM entries WHERE date = '2024-03-07'"))
+    expected = entry_ids()
+
+    path = str(database / "backup.json")
+    transfer.export_data(path)
+    db.write(lambda con: con.execute("DELETE FROM entries"))
+    db.set_entries([(habit_id, "2024-03-09", "done")])
+
+    transfer.import_data(path)
+    assert entry_ids() == expected
+
+
+def test_replace_import_keeps_rows_with_clashing_ids(database):
+    path = database / "backup.ndjson"
+    path.write_text(
+        '{"type": "habit", "id": 1, "name": "a"}\n'
+        '{"habit_id": 1, "date": "2024-03-06", "status": "done"}\n'
+        '{"id": 1, "habit_id": 1, "date": "2024-03-07", "status": "done"}\n'
+        '{"id": 1, "habit_id": 1, "date": "2024-03-08", "status": "done"}\n'
+        '{"id": 5, "habit_id": 1, "date": "2024-03-08", "status": "skipped"}\n',
+        encoding="utf-8",
+    )
+    counts = transfer.import_data(str(path))
+    assert counts["entries"] == 3
+    assert all_entries() == [(1, "2024-03-06", "done"), (1, "2024-03-07", "done"), (1, "2024-03-08", "skipped")]
@@ -0,0 +1,90 @@
+# Хуки вложенных записей потока-писателя и откат операции
+import sqlite3
+
+import db
+import events
+import transfer
+from writer import WriteQueue
+
+
+def make_queue(tmp_path):
+    path = str(tmp_path / "w.db")
+    con = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    con.execute("CREATE TABLE t (v INTEGER)")
+    return WriteQueue(lambda: con), con
+
+
+def test_nested_hooks_run_only_if_outer_operation_commits(tmp_path):
+    queue, con = make_queue(tmp_path)
+    fired = []
+
+    def inner(con, v):
+        con.execute("INSERT INTO t VALUES (?)", (v,))
+
+    def outer(con, v, fail):
+        queue.submit(inner, v, on_commit=lambda: fired.append(("inner", v))).result()
+        if fail:
+            raise ValueError("outer failed")
+
+    ok = queue.submit(outer, 1, False, on_commit=lambda: fired.append(("outer", 1)))
+    bad = queue.submit(outer, 2, True, on_commit=lambda: fired.append(("outer", 2)))
+    assert ok.result() is None
+    assert isinstance(bad.exception(), ValueError)
+    queue.close()
+
+    assert fired == [("inner", 1), ("outer", 1)]
+    assert con.execute("SELECT v FROM t").fetchall() == [(1,)]
+
+
+def test_failed_nested_write_drops_hooks_of_its_own_nested_writes(tmp_path):
+    queue, con = make_queue(tmp_path)
+    fired = []
+
+    def leaf(con):
+        con.execute("INSERT INTO t VALUES (1)")
+
+    def middle(con):
+        queue.submit(leaf, on_commit=lambda: fired.append("leaf")).result()
+        raise ValueError("middle failed")
+
+    def outer(con):
+        assert queue.submit(middle, on_commit=lambda: fired.append("middle")).exception() is not None
+        con.execute("INSERT INTO t VALUES (2)")
+
+    queue.submit(outer, on_commit=lambda: fired.append("outer")).result()
+    queue.close()
+
+    assert fired == ["outer"]
+    assert con.execute("SELECT v FROM t").fetchall() == [(2,)]
+
+
+def test_failed_merge_import_publishes_no_entry_events(tmp_path):
+    original = db.DB_PATH
+    db.use_database(str(tmp_path / "habits.db"))
+    try:
+        habit_id = db.add_habit({"name": "a", "color": "red", "status": "в процессе"})
+        # порция записей пишется через db.set_entries, затем разбор файла падает
+        path = tmp_path / "broken.json"
+        path.write_text(
+            '{"habits": [{"id": %d, "name": "a", "color": "red"}], "entries": [' % habit_id
+            + ", ".join('{"habit_id": %d, "date": "2024-03-%02d", "status": "done"}' % (habit_id, d) for d in range(1, 11))
+            + ', {"habit_id": ',
+            encoding="utf-8",
+        )
+        events.flush()
+        got = []
+        events.subscribe("test", lambda kind, data: got.append(kind))
+        try:
+            transfer.import_data(str(path), chunk_size=5, mode="merge")
+        except Exception:
+            pass
+        else:
+            raise AssertionError("обрезанный файл должен вызывать ошибку")
+        events.flush()
+
+        assert db.get_entries_between("2024-03-01", "2024-03-31") == []
+        assert events.ENTRIES_CHANGED not in got
+    finally:
+        events.unsubscribe("test")
+        db.close_all()
+        db.use_database(original)
@@ -0,0 +1,507 @@
+# transfer.py
+# Экспорт и импорт данных (JSON / NDJSON, опционально gzip)
+import gzip
+import io
+import json
+import os
+import struct
+import time
+from datetime import date
+import numpy as np
+import db
+import bitmaps
+import migrations
+import archive
+from connection import transaction
+
+HABIT_COLUMNS = ["id", "name", "color", "start_date", "end_date", "status", "notification_interval"]
+ENTRY_COLUMNS = ["id", "habit_id", "date", "status"]
+
+def detect_format(path: str):
+    """По расширению файла: ("json" | "ndjson", сжат ли gzip)."""
+    name = path.lower()
+    compressed = name.endswith(".gz")
+    if compressed:
+        name = name[:-3]
+    return ("ndjson" if name.endswith((".ndjson", ".jsonl")) else "json"), compressed
+
+def _open_text(path: str, mode: str, compressed: bool):
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def export_data(path: str, progress=None, chunk_size: int = 5000) -> dict:
+    """
+    Потоковый экспорт: записи читаются курсором порциями по chunk_size и сразу
+    пишутся в файл, поэтому память не зависит от количества строк. Формат
+    определяется по расширению (.json, .ndjson, + .gz; .hbk — бинарный). progress(done, total)
+    вызывается после каждой порции. Файл пишется во временный и подменяется
+    целиком, чтобы при ошибке не оставить обрезанный экспорт.
+    """
+    if path.lower().endswith(HBK_SUFFIX):
+        return export_columnar(path, progress)
+    fmt, compressed = detect_format(path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    con = db.get_conn()
+    counts = {"habits": 0, "entries": 0}
+    try:
+        # Одна читающая транзакция — согласованный снимок, пока пишет поток-писатель
+        with transaction(con), _open_text(tmp_path, "w", compressed) as f:
+            total = con.execute(f"SELECT COUNT(*) FROM {migrations.ALL_ENTRIES}").fetchone()[0]
+            habit_rows = con.execute(f"SELECT {', '.join(HABIT_COLUMNS)} FROM habits ORDER BY id").fetchall()
+            habits = [dict(zip(HABIT_COLUMNS, r)) for r in habit_rows]
+            counts["habits"] = len(habits)
+
+            if fmt == "ndjson":
+                for h in habits:
+                    f.write(json.dumps({"type": "habit", **h}, ensure_ascii=False) + "\n")
+            else:
+                f.write('{\n  "habits": [')
+                f.write(",".join("\n    " + json.dumps(h, ensure_ascii=False) for h in habits))
+                f.write('\n  ],\n  "entries": [')
+
+            # Архивные записи выгружаются вместе с горячими (сначала entries, затем архив)
+            cur = con.execute(f"SELECT {', '.join(ENTRY_COLUMNS)} FROM {migrations.ALL_ENTRIES}")
+            first = True
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if fmt == "ndjson":
+                    f.write("".join(
+                        json.dumps({"type": "entry", **dict(zip(ENTRY_COLUMNS, r))}, ensure_ascii=False) + "\n"
+                        for r in rows
+                    ))
+                else:
+                    chunk = ",".join("\n    " + json.dumps(dict(zip(ENTRY_COLUMNS, r)), ensure_ascii=False) for r in rows)
+                    f.write(chunk if first else "," + chunk)
+                first = False
+                counts["entries"] += len(rows)
+                if progress:
+                    progress(counts["entries"], total)
+
+            if fmt == "json":
+                f.write("\n  ]\n}\n")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return counts
+
+
+# --- бинарный колоночный формат (.hbk) ---
+#
+# "HBK1" | u32 длина заголовка | заголовок JSON (привычки, число записей, словарь
+# статусов) | выравнивание до 8 байт | habit_id int32[n] | day int32[n] | status uint8[n]
+#
+# day — номер дня (date.toordinal()), status — индекс в словаре статусов.
+# Колонки читаются через np.memmap без разбора текста.
+
+HBK_SUFFIX = ".hbk"
+HBK_MAGIC = b"HBK1"
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _hbk_columns(mm, count):
+    return mm[:4 * count].view("<i4"), mm[4 * count:8 * count].view("<i4"), mm[8 * count:]
+
+# Формат хранит номер дня, поэтому записи с нераспознаваемой датой (day = NULL)
+# в него не попадают — их число возвращается в "skipped"
+_HBK_ENTRIES = f"(SELECT habit_id, day, status FROM {migrations.ALL_ENTRIES} WHERE day IS NOT NULL)"
+
+def export_columnar(path: str, progress=None, chunk_size: int = 50000) -> dict:
+    """Экспорт в бинарный колоночный формат .hbk (колонки заполняются через memmap)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    con = db.get_conn()
+    try:
+        with transaction(con):
+            total = con.execute(f"SELECT COUNT(*) FROM {migrations.ALL_ENTRIES}").fetchone()[0]
+            count = con.execute(f"SELECT COUNT(*) FROM {_HBK_ENTRIES}").fetchone()[0]
+            statuses = [r[0] for r in con.execute(f"SELECT DISTINCT status FROM {_HBK_ENTRIES} ORDER BY status")]
+            if len(statuses) > 256:
+                raise ValueError("Слишком много различных статусов для формата .hbk")
+            habit_rows = con.execute(f"SELECT {', '.join(HABIT_COLUMNS)} FROM habits ORDER BY id").fetchall()
+            habits = [dict(zip(HABIT_COLUMNS, r)) for r in habit_rows]
+            header = json.dumps({"habits": habits, "count": count, "statuses": statuses}, ensure_ascii=False).encode("utf-8")
+            base = (8 + len(header) + 7) // 8 * 8
+            with open(tmp_path, "wb") as f:
+                f.write(HBK_MAGIC + struct.pack("<I", len(header)) + header)
+                f.write(b"\0" * (base - 8 - len(header)))
+                f.truncate(base + 9 * count)
+            if count:
+                mm = np.memmap(tmp_path, mode="r+", dtype=np.uint8, offset=base, shape=(9 * count,))
+                habit_ids, days, codes = _hbk_columns(mm, count)
+                code_of = {status: i for i, status in enumerate(statuses)}
+                cur = con.execute(f"SELECT habit_id, day, status FROM {_HBK_ENTRIES}")
+                pos = 0
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    n = len(rows)
+                    hs, ds, ss = zip(*rows)
+                    habit_ids[pos:pos + n] = hs
+                    days[pos:pos + n] = ds
+                    codes[pos:pos + n] = [code_of[s] for s in ss]
+                    pos += n
+                    if progress:
+                        progress(pos, count)
+                mm.flush()
+                del mm, habit_ids, days, codes
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"habits": len(habits), "entries": count, "skipped": total - count}
+
+def _iter_columnar(path: str, chunk_size: int):
+    """(записи для импорта, общее число строк) из файла .hbk."""
+    with open(path, "rb") as f:
+        if f.read(4) != HBK_MAGIC:
+            raise ValueError("Файл не является резервной копией формата .hbk")
+        header_len = struct.unpack("<I", f.read(4))[0]
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    base = (8 + header_len + 7) // 8 * 8
+    count = header["count"]
+    statuses = np.array(header["statuses"], dtype=object)
+
+    def records():
+        for h in header["habits"]:
+            yield "habit", h
+        if not count:
+            return
+        mm = np.memmap(path, mode="r", dtype=np.uint8, offset=base, shape=(9 * count,))
+        habit_ids, days, codes = _hbk_columns(mm, count)
+        for start in range(0, count, chunk_size):
+            part = slice(start, start + chunk_size)
+            # номер дня -> 'YYYY-MM-DD' векторно, через datetime64
+            dates = (days[part].astype(np.int64) - _EPOCH_ORDINAL).astype("datetime64[D]").astype(str)
+            yield "entry_rows", list(zip(habit_ids[part].tolist(), dates.tolist(), statuses[codes[part]].tolist()))
+
+    return records(), len(header["habits"]) + count
+
+# --- импорт ---
+
+HABIT_STATUSES = ("в процессе", "выполнено", "заброшено")
+
+class _JsonStream:
+    """
+    Минимальный инкрементальный разбор JSON: читает файл блоками и декодирует
+    значения по одному через raw_decode, не загружая весь документ в память.
+    """
+
+    def __init__(self, f, block_size: int = 1 << 16):
+        self.f = f
+        self.block_size = block_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        data = self.f.read(self.block_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise json.JSONDecodeError(f"Ожидалось одно из {chars!r}", self.buf, self.pos)
+        self.pos += 1
+        return c
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self._fill():
+                    raise
+                continue
+            # число на границе блока могло быть обрезано — дочитываем и повторяем
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+def _iter_json(f):
+    stream = _JsonStream(f)
+    kinds = {"habits": "habit", "entries": "entry"}
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key in kinds and stream.peek() == "[":
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.expect("]")
+            else:
+                while True:
+                    yield kinds[key], stream.value()
+                    if stream.expect(",]") == "]":
+                        break
+        else:
+            stream.value()
+        if stream.expect(",}") == "}":
+            break
+
+def _iter_ndjson(f):
+    for line in f:
+        if line.strip():
+            record = json.loads(line)
+            yield record.pop("type", "entry"), record
+
+def _valid_habit(h):
+    if not isinstance(h, dict) or not isinstance(h.get("name"), str) or not h["name"].strip():
+        return None
+    status = h.get("status") if h.get("status") in HABIT_STATUSES else "в процессе"
+    return (
+        h.get("id"), h["name"], h.get("color") or "blue", h.get("start_date"), h.get("end_date"),
+        status, h.get("notification_interval", "Без уведомлений")
+    )
+
+def _valid_entry(en):
+    if not isinstance(en, dict):
+        return None
+    habit_id, day, status = en.get("habit_id"), en.get("date"), en.get("status")
+    if not isinstance(habit_id, int) or not isinstance(status, str) or not status:
+        return None
+    entry_id = en.get("id")
+    if not isinstance(entry_id, int) or isinstance(entry_id, bool):
+        entry_id = None
+    try:
+        if len(day) != 10:
+            return None
+        date.fromisoformat(day)
+    except (TypeError, ValueError):
+        return None
+    return habit_id, day, status, entry_id
+
+class _ImportProgress:
+    def __init__(self, callback, fraction):
+        # fraction() — доля обработанного входа от 0 до 1
+        self.callback = callback
+        self.fraction = fraction
+        self.started = time.perf_counter()
+        self.rows = 0
+
+    def stats(self) -> dict:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "rows": self.rows,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(self.rows / elapsed, 1),
+            "fraction": min(self.fraction(), 1.0),
+        }
+
+    def report(self):
+        if self.callback:
+            self.callback(self.stats())
+
+def _replace_all(con, records, progress, chunk_size):
+    # Триггеры и индексы снимаются на время загрузки и восстанавливаются в конце:
+    # построить индекс один раз дешевле, чем обновлять его на каждой вставке
+    with_bitmaps = bitmaps.is_enabled(con)
+    migrations.drop_rollup_triggers(con)
+    migrations.drop_archive_triggers(con)
+    migrations.drop_entry_indexes(con)
+    # Импорт заменяет и архив: все загруженные записи попадают в entries
+    archive.clear(con)
+    con.execute("DELETE FROM entries")
+    con.execute("DELETE FROM habits")
+
+    counts = {"habits": 0, "entries": 0, "rejected": 0}
+    habits, entries = [], []
+
+    def flush():
+        if habits:
+            con.executemany(
+                "INSERT INTO habits (id, name, color, start_date, end_date, status, notification_interval) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", habits
+            )
+            counts["habits"] += len(habits)
+            habits.clear()
+        if entries:
+            # id из файла сохраняется; строки без id получают новый
+            con.execute("SAVEPOINT import_chunk")
+            inserted = con.executemany(
+                "INSERT OR IGNORE INTO entries (habit_id, date, status, id) VALUES (?, ?, ?, ?)", entries
+            ).rowcount
+            if inserted < len(entries):
+                con.execute("ROLLBACK TO import_chunk")
+                inserted = _insert_keeping_order(con, entries)
+            con.execute("RELEASE import_chunk")
+            counts["entries"] += inserted
+            entries.clear()
+        progress.rows = counts["habits"] + counts["entries"]
+        progress.report()
+
+    for kind, record in records:
+        if kind == "entry_rows":
+            # готовая порция (habit_id, date, status) из бинарного формата
+            con.executemany("INSERT INTO entries (habit_id, date, status) VALUES (?, ?, ?)", record)
+            counts["entries"] += len(record)
+            flush()
+            continue
+        row = _valid_habit(record) if kind == "habit" else _valid_entry(record) if kind == "entry" else None
+        if row is None:
+            counts["rejected"] += 1
+            continue
+        (habits if kind == "habit" else entries).append(row)
+        if len(habits) + len(entries) >= chunk_size:
+            flush()
+    flush()
+
+    # Отложенные проверки: записи несуществующих привычек и дубликаты (habit_id, date);
+    # из дубликатов остаётся запись с большим id, как в миграции индексов
+    orphans = con.execute("DELETE FROM entries WHERE habit_id NOT IN (SELECT id FROM habits)").rowcount
+    duplicates = con.execute(
+        "DELETE FROM entries WHERE id NOT IN (SELECT MAX(id) FROM entries GROUP BY habit_id, date)"
+    ).rowcount
+    counts["rejected"] += orphans
+    counts["entries"] -= orphans + duplicates
+    migrations.create_entry_indexes(con)
+    migrations.rebuild_rollups(con)
+    migrations.create_rollup_triggers(con)
+    migrations.create_archive_triggers(con)
+    if with_bitmaps:
+        bitmaps.enable(con)
+    return counts
+
+def _insert_keeping_order(con, rows) -> int:
+    # В порции есть занятый id (повтор в файле или строка без id получила его раньше):
+    # такая запись сохраняется под новым id в порядке файла, дубликаты (habit_id, date)
+    # снимет общая проверка. Точная копия уже вставленной строки пропускается.
+    added = 0
+    for row in rows:
+        if con.execute(
+            "INSERT OR IGNORE INTO entries (habit_id, date, status, id) VALUES (?, ?, ?, ?)", row
+        ).rowcount:
+            added += 1
+        elif con.execute("SELECT habit_id, date, status FROM entries WHERE id=?", (row[3],)).fetchone() != row[:3]:
+            con.execute("INSERT INTO entries (habit_id, date, status) VALUES (?, ?, ?)", row[:3])
+            added += 1
+    return added
+
+_HABIT_FIELDS = ("name", "color", "start_date", "end_date", "status", "notification_interval")
+
+def _merge(con, records, progress, chunk_size):
+    # Привычки сопоставляются по id, затем по имени; записи — по (habit_id, date).
+    # Пишется только то, что отличается от текущих данных.
+    existing = {}
+    by_name = {}
+    for r in con.execute(f"SELECT id, {', '.join(_HABIT_FIELDS)} FROM habits"):
+        existing[r[0]] = r[1:]
+        by_name.setdefault(r[1], r[0])
+    id_map = {}
+    counts = {"habits_inserted": 0, "habits_updated": 0, "inserted": 0, "updated": 0, "unchanged": 0, "rejected": 0}
+    entries = []
+
+    def flush():
+        if entries:
+            stats = db.set_entries(entries)
+            for key in ("inserted", "updated", "unchanged"):
+                counts[key] += stats[key]
+            progress.rows += len(entries)
+            entries.clear()
+        progress.report()
+
+    for kind, record in records:
+        if kind == "habit":
+            row = _valid_habit(record)
+            if row is None:
+                counts["rejected"] += 1
+                continue
+            file_id, values = row[0], row[1:]
+            target = file_id if file_id in existing else by_name.get(values[0])
+            if target is None:
+                cur = con.execute(
+                    "INSERT INTO habits (id, name, color, start_date, end_date, status, notification_interval) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (file_id if file_id not in existing else None, *values)
+                )
+                target = cur.lastrowid
+                existing[target] = values
+                by_name.setdefault(values[0], target)
+                counts["habits_inserted"] += 1
+            elif existing[target] != values:
+                con.execute(
+                    f"UPDATE habits SET {', '.join(f'{k}=?' for k in _HABIT_FIELDS)} WHERE id=?",
+                    (*values, target)
+                )
+                existing[target] = values
+                by_name.setdefault(values[0], target)
+                counts["habits_updated"] += 1
+            if file_id is not None:
+                id_map[file_id] = target
+        elif kind in ("entry", "entry_rows"):
+            for row in ([_valid_entry(record)] if kind == "entry" else record):
+                habit_id = id_map.get(row[0], row[0] if row[0] in existing else None) if row else None
+                if habit_id is None:
+                    counts["rejected"] += 1
+                    continue
+                entries.append((habit_id, row[1], row[2]))
+            if len(entries) >= chunk_size:
+                flush()
+        else:
+            counts["rejected"] += 1
+    flush()
+    return counts
+
+def import_data(path: str, progress=None, chunk_size: int = 5000, mode: str = "replace") -> dict:
+    """
+    Импорт данных. Файл разбирается потоково (JSON или NDJSON, опционально
+    gzip), строки проверяются и пишутся executemany порциями по chunk_size в
+    одной транзакции потока-писателя. progress(stats) получает число строк,
+    скорость (строк/с) и долю прочитанного файла.
+
+    mode="replace" — заменить все данные содержимым файла;
+    mode="merge" — слить с текущими данными, записывая только изменения.
+    """
+    if path.lower().endswith(HBK_SUFFIX):
+        records, total = _iter_columnar(path, chunk_size)
+        return load_records(records, progress, chunk_size, mode, total_rows=total)
+    fmt, compressed = detect_format(path)
+    with open(path, "rb") as raw:
+        size = os.fstat(raw.fileno()).st_size or 1
+        stream = gzip.GzipFile(fileobj=raw) if compressed else raw
+        f = io.TextIOWrapper(stream, encoding="utf-8")
+        records = _iter_ndjson(f) if fmt == "ndjson" else _iter_json(f)
+        return load_records(records, progress, chunk_size, mode, fraction=lambda: raw.tell() / size)
+
+def load_records(records, progress=None, chunk_size: int = 5000, mode: str = "replace",
+                 fraction=None, total_rows: int = None) -> dict:
+    """
+    Загрузить уже разобранные записи так же, как import_data загружает файл:
+    ("habit", {...}), ("entry", {...}) или ("entry_rows", [(habit_id, date, status), ...]).
+    Для данных, которые строятся в памяти (генератор бенчмарков), без
+    промежуточного файла. Доля прогресса — fraction() или rows / total_rows.
+    """
+    op = _merge if mode == "merge" else _replace_all
+    if fraction is None:
+        fraction = lambda: tracker.rows / max(total_rows, 1) if total_rows else 0.0
+    tracker = _ImportProgress(progress, fraction)
+    counts = db.write(op, records, tracker, chunk_size, on_commit=db.data_reloaded)
+    counts.update(tracker.stats())
+    return counts
@@ -0,0 +1,114 @@
+# writebehind.py
+# Отложенная запись отметок: интерфейс меняется сразу, а в базу уходит только
+# итоговое состояние каждой (habit_id, date) — одной пачкой после паузы в кликах.
+import threading
+import weakref
+import db
+
+# Все живые накопители: их дописывают при смене вкладки и выходе из приложения
+_instances = weakref.WeakSet()
+
+
+def flush_all(wait: bool = True):
+    """Записать отложенные отметки всех накопителей (wait=True — дождаться коммита)."""
+    for writer in list(_instances):
+        writer.flush(wait=wait)
+
+
+class EntryWriteBehind:
+    """
+    Накопитель отметок с дебаунсом. set() запоминает новый статус и
+    перезапускает таймер; через delay секунд без новых отметок всё накопленное
+    записывается одним db.set_entries(wait=False). Если отметку вернули в
+    исходное состояние до записи, в базу ничего не пишется.
+
+    on_error(failed, error) вызывается (из потока-писателя), если пачка не
+    записалась: failed — {(habit_id, date): исходное значение}, чтобы
+    интерфейс мог откатить оптимистичные изменения.
+    """
+
+    def __init__(self, delay: float = 0.3, on_error=None):
+        self.delay = delay
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        # (profile, habit_id, date) -> [статус, исходное значение]
+        self._pending = {}
+        # то же для пачек, которые уже в очереди записи
+        self._in_flight = {}
+        self._timer = None
+        _instances.add(self)
+
+    def set(self, habit_id: int, date: str, status: str, original=None):
+        """original — состояние до первого изменения (им откатывается интерфейс при ошибке)."""
+        key = (db.active_profile(), habit_id, date)
+        with self._lock:
+            item = self._pending.get(key)
+            if item is None:
+                self._pending[key] = [status, original]
+            elif item[1] is not None and _as_status(item[1]) == status:
+                # вернули как было — писать нечего
+                del self._pending[key]
+            else:
+                item[0] = status
+            self._restart_timer()
+
+    def is_pending(self, habit_id: int, date: str) -> bool:
+        """Есть ли для отметки незаписанное изменение (события о ней устарели)."""
+        key = (db.active_profile(), habit_id, date)
+        with self._lock:
+            return key in self._pending or key in self._in_flight
+
+    def _restart_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self, wait: bool = False):
+        """Записать всё накопленное сейчас. wait=True — дождаться коммита."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch, self._pending = self._pending, {}
+            self._in_flight.update(batch)
+        by_profile = {}
+        for (profile, habit_id, date), item in batch.items():
+            by_profile.setdefault(profile, {})[(habit_id, date)] = item
+        futures = []
+        for profile, items in by_profile.items():
+            with db.profile(profile):
+                future = db.set_entries([(h, d, item[0]) for (h, d), item in items.items()], wait=False)
+            future.add_done_callback(lambda f, p=profile, items=items: self._done(f, p, items))
+            futures.append(future)
+        if wait:
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    pass  # уже обработано в _done
+        return futures
+
+    def _done(self, future, profile, items):
+        error = future.exception()
+        failed = {}
+        with self._lock:
+            for (habit_id, date), item in items.items():
+                key = (profile, habit_id, date)
+                # отметку могли снова отправить более новой пачкой — её не трогаем
+                current = self._in_flight.get(key) is item
+                if current:
+                    del self._in_flight[key]
+                # откатываем только то, что после этого не меняли и не отправляли заново
+                if error is not None and current and key not in self._pending:
+                    failed[(habit_id, date)] = item[1]
+        if failed and self.on_error:
+            self.on_error(failed, error)
+
+
+def _as_status(value) -> str:
+    # исходное значение чекбокса (bool) или статус записи
+    if isinstance(value, bool):
+        return "done" if value else "skipped"
+    return value
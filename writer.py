@@ -0,0 +1,132 @@
+# writer.py
+# Единственный поток-писатель: все записи в базу проходят через очередь
+import queue
+import threading
+from concurrent.futures import Future
+
+from connection import transaction
+
+
+class WriteQueue:
+    """
+    Очередь операций записи с выделенным потоком. Поток забирает из очереди всё,
+    что накопилось (до max_batch операций), выполняет в одной транзакции —
+    каждую под своим SAVEPOINT, чтобы ошибка одной операции не отменяла
+    остальные, — и делает один COMMIT на всю пачку (group commit).
+
+    Операция — функция fn(con, *args); результат или исключение попадает во
+    Future, который возвращает submit(). on_commit вызывается после COMMIT.
+    """
+
+    def __init__(self, connect, max_batch: int = 256):
+        self._connect = connect
+        self._max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        # хуки вложенных записей текущей операции пачки: выполняются после COMMIT
+        # вместе с её on_commit и отбрасываются, если операция откатилась
+        self._inline_hooks = []
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, fn, *args, on_commit=None) -> Future:
+        if threading.current_thread() is self._thread:
+            # Запись изнутри другой операции записи: выполняем сразу, в её транзакции,
+            # иначе поток ждал бы сам себя
+            future = Future()
+            con = self._connect()
+            # хуки записей, вложенных в эту, откатываются вместе с ней
+            mark = len(self._inline_hooks)
+            try:
+                with transaction(con):
+                    future.set_result(fn(con, *args))
+            except BaseException as ex:
+                del self._inline_hooks[mark:]
+                future.set_exception(ex)
+            else:
+                if on_commit:
+                    self._inline_hooks.append(on_commit)
+            return future
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((fn, args, on_commit, future))
+        return future
+
+    def close(self):
+        """Дождаться выполнения всех операций и остановить поток."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def _run(self):
+        con = self._connect()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self._max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit_batch(con, batch)
+            if stop:
+                return
+
+    def _commit_batch(self, con, batch):
+        outcomes = []
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            for fn, args, on_commit, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._inline_hooks = []
+                con.execute("SAVEPOINT op")
+                try:
+                    value = fn(con, *args)
+                except BaseException as ex:
+                    con.execute("ROLLBACK TO op")
+                    con.execute("RELEASE op")
+                    # вложенные записи откатились вместе с операцией — их хуки не нужны
+                    outcomes.append((future, None, ex, []))
+                else:
+                    con.execute("RELEASE op")
+                    outcomes.append((future, value, None, self._inline_hooks + ([on_commit] if on_commit else [])))
+            con.execute("COMMIT")
+        except BaseException as ex:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(ex)
+            return
+        finally:
+            self._inline_hooks = []
+        for future, value, error, hooks in outcomes:
+            if error is not None:
+                future.set_exception(error)
+                continue
+            for hook in hooks:
+                _call_hook(hook)
+            future.set_result(value)
+
+
+def _call_hook(hook):
+    try:
+        hook()
+    except Exception as ex:
+        print("Ошибка обработчика после записи:", ex)